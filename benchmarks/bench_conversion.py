@@ -0,0 +1,219 @@
+# Micro-benchmarks for the conversion layers and the overhead of calling
+# wrapped R functions. Only base R and Matrix are needed, so it can be run
+# offline:
+#
+#   python benchmarks/bench_conversion.py --output bench.json
+#   python benchmarks/bench_conversion.py --compare bench.json
+#
+# For each case and size the timings of py -> R conversion, R -> py
+# conversion and the end-to-end call of `base::identity` are recorded, such
+# that regressions can be traced to a single layer
+import argparse
+import json
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import scipy.sparse
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import wrapr as wr
+
+from wrapr.convert_py2r import convert_pyobject2r
+from wrapr.convert_r2py import convert_r2py
+from wrapr.function_wrapper import wrap_rfunc
+from wrapr.rutils import rcall
+
+
+SIZES: List[int] = [10**k for k in range(2, 8)]
+
+
+def make_numpy1d(n: int) -> Any:
+    return np.random.default_rng(1).standard_normal(n)
+
+
+def make_numpy2d(n: int) -> Any:
+    return make_numpy1d(n).reshape(-1, 10) if n >= 10 else make_numpy1d(n)
+
+
+def make_numpyNd(n: int) -> Any:
+    return make_numpy1d(n).reshape(-1, 5, 2) if n >= 10 else make_numpy1d(n)
+
+
+def make_integers(n: int) -> Any:
+    return np.arange(n, dtype=np.int64)
+
+
+def make_strings(n: int) -> Any:
+    return np.array([f"s{i % 1000}" for i in range(n)])
+
+
+def make_dataframe(n: int) -> Any:
+    rng = np.random.default_rng(1)
+    return pd.DataFrame({
+        "x": rng.standard_normal(n),
+        "i": np.arange(n, dtype=np.int32),
+        "g": pd.Categorical.from_codes(rng.integers(0, 5, n),
+                                       categories=list("abcde")),
+    })
+
+
+def make_sparse(n: int) -> Any:
+    # n is the number of non-zero elements
+    side: int = max(int(np.sqrt(n * 100)), 1)
+    return scipy.sparse.random(side, side, density=min(n / side**2, 1.0),
+                               format="csc", random_state=1)
+
+
+def make_nested(n: int) -> Any:
+    # nested dicts/lists with n leaves in total
+    return {f"k{i}": {"a": [1.0, 2.0, 3.0], "b": "x", "c": i}
+            for i in range(max(n // 5, 1))}
+
+
+CASES: Dict[str, Callable[[int], Any]] = {
+    "numpy1d": make_numpy1d,
+    "numpy2d": make_numpy2d,
+    "numpyNd": make_numpyNd,
+    "integers": make_integers,
+    "strings": make_strings,
+    "dataframe": make_dataframe,
+    "sparse": make_sparse,
+    "nested": make_nested,
+}
+
+# cases where the pure python construction/conversion is too slow for the
+# largest sizes
+MAX_SIZE: Dict[str, int] = {"strings": 10**6, "nested": 10**5}
+
+
+def timeit(f: Callable[[], Any], repeat: int, budget: float) -> Dict[str, float]:
+    # best and median of `repeat` runs, stopping early once the time budget
+    # (in seconds) is exhausted
+    times: List[float] = []
+    start: float = time.perf_counter()
+    for _ in range(repeat):
+        t0: float = time.perf_counter()
+        f()
+        times.append(time.perf_counter() - t0)
+        if time.perf_counter() - start > budget:
+            break
+    return {"min": min(times), "median": float(np.median(times)),
+            "runs": len(times)}
+
+
+def bench_case(name: str, n: int, repeat: int, budget: float) -> Dict[str, Any]:
+    x: Any = CASES[name](n)
+    identity: Callable = wrap_rfunc(rcall("identity"), name="identity")
+    robj: Any = convert_pyobject2r(x)
+    return {
+        "case": name,
+        "size": n,
+        "py2r": timeit(lambda: convert_pyobject2r(x), repeat, budget),
+        "r2py": timeit(lambda: convert_r2py(robj), repeat, budget),
+        "call": timeit(lambda: identity(x), repeat, budget),
+    }
+
+
+SMALL_MATRIX = np.ones((10, 3))
+SCALARS: List[Any] = [1, 2.5, "a", True, None] * 20
+
+
+def bench_overhead(repeat: int) -> Dict[str, Any]:
+    # overhead of calling trivial R functions, where no time is spent on
+    # conversion or in R
+    base = wr.library("base")
+    stats = wr.library("stats")
+    rnull: Callable = rcall("function() NULL")
+    wnull: Callable = wrap_rfunc(rnull, name=None)
+    return {
+        "case": "overhead",
+        "size": 1,
+        "raw_rpy2": timeit(rnull, repeat * 100, 5.0),
+        "wrapped": timeit(wnull, repeat * 100, 5.0),
+        "library": timeit(lambda: base.invisible(1), repeat * 100, 5.0),
+        # small calls, dominated by argument handling
+        "nrow": timeit(lambda: base.nrow(SMALL_MATRIX), repeat * 100, 5.0),
+        "set_seed": timeit(lambda: base.set_seed(1), repeat * 100, 5.0),
+        "runif": timeit(lambda: stats.runif(10, min=0, max=1), repeat * 100, 5.0),
+        "py2r_scalars": timeit(lambda: [convert_pyobject2r(x) for x in SCALARS],
+                               repeat * 100, 5.0),
+    }
+
+
+def run(cases: List[str], sizes: List[int], repeat: int,
+        budget: float) -> Dict[str, Any]:
+    results: List[Dict[str, Any]] = [bench_overhead(repeat)]
+    for name in cases:
+        for n in sizes:
+            if n > MAX_SIZE.get(name, n):
+                continue
+            print(f"{name:>10} {n:>10}", file=sys.stderr, flush=True)
+            results.append(bench_case(name, n, repeat, budget))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "R": str(rcall("R.version.string")[0]),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any],
+            threshold: float) -> List[str]:
+    # lines for the (case, size, layer) timings which got slower than
+    # `threshold` times the old timing
+    key = lambda r: (r["case"], r["size"])
+    before: Dict[Any, Dict[str, Any]] = {key(r): r for r in old["results"]}
+    out: List[str] = []
+    for r in new["results"]:
+        o = before.get(key(r))
+        if o is None:
+            continue
+        for layer, t in r.items():
+            if not isinstance(t, dict) or layer not in o:
+                continue
+            ratio: float = t["min"] / o[layer]["min"]
+            flag: str = "  REGRESSION" if ratio > threshold else ""
+            out.append(f"{r['case']:>10} {r['size']:>10} {layer:>9} "
+                       f"{o[layer]['min']:10.6f} -> {t['min']:10.6f} "
+                       f"({ratio:5.2f}x){flag}")
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cases", nargs="*", default=list(CASES),
+                        choices=list(CASES))
+    parser.add_argument("--sizes", nargs="*", type=int, default=SIZES)
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--budget", type=float, default=10.0,
+                        help="maximum seconds spent per timing")
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None,
+                        help="earlier results to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args()
+
+    results = run(args.cases, sorted(args.sizes), args.repeat, args.budget)
+    if args.output is not None:
+        args.output.write_text(json.dumps(results, indent=2))
+    if args.compare is not None:
+        old = json.loads(args.compare.read_text())
+        lines = compare(old, results, args.threshold)
+        print("\n".join(lines))
+        if any(x.endswith("REGRESSION") for x in lines):
+            sys.exit(1)
+    elif args.output is None:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,46 @@
-import warnings
-warnings.simplefilter("always")
-
-from .renv import Renv
-from .library import library, importr
-from .load_namespace import try_load_namespace
-from .lazy_rexpr import lazily
-from .robject import Robject
+from .options import get_option, set_option, option_context
+
+# The rest of the API is imported on first use (PEP 562), such that
+# `import wrapr` doesn't import rpy2 (and start R), pandas or scipy
+_EXPORTS: dict[str, str] = {
+    "Renv": ".renv",
+    "library": ".library",
+    "importr": ".library",
+    "try_load_namespace": ".load_namespace",
+    "lazily": ".lazy_rexpr",
+    "Robject": ".robject",
+    "stats": ".profiling",
+    "reset_stats": ".profiling",
+    "profile": ".profiling",
+    "add_profile_callback": ".profiling",
+    "remove_profile_callback": ".profiling",
+    "freeze": ".convert_cache",
+    "clear_conversion_cache": ".convert_cache",
+    "pipe": ".pipe",
+    "Pool": ".pool",
+    "map_chunks": ".chunks",
+    "RList": ".rlist",
+    "scope": ".rmemory",
+    "memory": ".rmemory",
+    "collect": ".rmemory",
+    "vcall": ".batch",
+}
+
+
+# submodules which are part of the API, e.g., `wr.aio.library()`
+_SUBMODULES: set[str] = {"aio"}
+
+
+def __getattr__(name: str):
+    import importlib
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(_EXPORTS[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | _EXPORTS.keys() | _SUBMODULES)
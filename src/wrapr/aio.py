@@ -0,0 +1,59 @@
+# asyncio front end. All calls are queued to a single thread owning the
+# embedded R session (see `rthread`), such that the event loop isn't blocked
+# while R runs, e.g.,
+#
+#   gs = wr.aio.library("GaussSuppression")
+#   out = await gs.GaussSuppressDec(df, ...)
+#
+# or `await wr.library("GaussSuppression").acall.GaussSuppressDec(df, ...)`.
+# Conversion between python and R touches R's memory, and is therefore run
+# on the R thread as well
+from __future__ import annotations
+
+import asyncio
+import functools
+import contextvars
+
+from typing import TYPE_CHECKING, Any, Callable
+
+from .rthread import start_rthread
+
+if TYPE_CHECKING:
+    from .renv import Renv
+
+
+async def run(f: Callable, *args, **kwargs) -> Any:
+    # runs `f(*args, **kwargs)` on the R thread
+    executor = start_rthread()
+    loop = asyncio.get_running_loop()
+    # in the context of the calling task, see `rthread`
+    context: contextvars.Context = contextvars.copy_context()
+    return await loop.run_in_executor(executor, functools.partial(context.run, f, *args, **kwargs))
+
+
+class AsyncRenv:
+    # mirrors an Renv, where functions are coroutine functions. The Renv is
+    # created on the R thread, on first use
+    def __init__(self, env_name: str | None = None, renv: Renv | None = None,
+                 robject: bool = False) -> None:
+        self.__env_name__ = env_name
+        self.__renv__ = renv
+        self.__robject__ = robject
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        async def call(*args, **kwargs) -> Any:
+            return await run(self.__call_rfunc__, name, args, kwargs)
+        call.__name__ = name
+        return call
+
+    def __call_rfunc__(self, name: str, args: tuple, kwargs: dict) -> Any:
+        if self.__renv__ is None:
+            from .library import library
+            self.__renv__ = library(self.__env_name__, robject=self.__robject__)
+        return getattr(self.__renv__, name)(*args, **kwargs)
+
+
+def library(env_name: str, robject: bool = False) -> AsyncRenv:
+    return AsyncRenv(env_name, robject=robject)
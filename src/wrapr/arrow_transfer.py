@@ -0,0 +1,117 @@
+# Transfer of data frames between python and R through the Arrow C stream
+# interface, using pyarrow on the python side, and the nanoarrow R package.
+# Columns are moved as Arrow arrays, so dictionary-encoded (factor) and
+# nullable columns aren't converted element by element. On the python side
+# the table is converted with pyarrow's default pandas conversion, where
+# string columns become object columns (like in `convert_pandas()`).
+#
+# Used automatically for data frames larger than `arrow_threshold` bytes
+# (when `set_option("arrow", "auto")`, the default), if pyarrow and nanoarrow
+# are installed. Otherwise `pandas2r()` and `convert_pandas()` are used, as
+# they are when the Arrow path fails in "auto" mode (e.g., for columns of
+# mixed types, which pyarrow can't convert)
+from __future__ import annotations
+
+import importlib.util
+
+from functools import cache
+from typing import TYPE_CHECKING, Any, Callable
+
+from .options import OPTIONS
+from .utils import loaded_module
+
+if TYPE_CHECKING:
+    import pandas as pd
+    import pyarrow as pa
+
+
+@cache
+def arrow_available() -> bool:
+    if importlib.util.find_spec("pyarrow") is None:
+        return False
+    from .rutils import rcall
+    return bool(rcall('requireNamespace("nanoarrow", quietly = TRUE)')[0])
+
+
+def use_arrow(nbytes: int) -> bool:
+    mode: Any = OPTIONS["arrow"]
+    if not mode:
+        return False
+    if mode == "auto" and nbytes < OPTIONS["arrow_threshold"]:
+        return False
+    return arrow_available()
+
+
+def try_arrow(f: Callable[[Any], Any], x: Any) -> Any | None:
+    # None if the Arrow path fails in "auto" mode, such that the caller
+    # falls back to the default conversion
+    try:
+        return f(x)
+    except Exception:
+        if OPTIONS["arrow"] != "auto":
+            raise
+        return None
+
+
+def is_arrow_table(x: Any) -> bool:
+    pa: Any = loaded_module("pyarrow")
+    return pa is not None and isinstance(x, (pa.Table, pa.RecordBatch))
+
+
+def pandas2r_arrow(x: pd.DataFrame) -> Any:
+    import pyarrow as pa
+    return arrow2r(narrow_integers(pa.Table.from_pandas(x, preserve_index=False)))
+
+
+def narrow_integers(x: pa.Table) -> pa.Table:
+    # nanoarrow converts 64bit (and unsigned 32bit) integers to doubles,
+    # while `pandas2r()` converts them to R integers when they fit. Such
+    # columns are cast to int32, such that the column types don't depend on
+    # the size of the data frame
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    for i, field in enumerate(x.schema):
+        if field.type not in (pa.int64(), pa.uint64(), pa.uint32()):
+            continue
+        bounds = pc.min_max(x.column(i))
+        lo, hi = bounds["min"].as_py(), bounds["max"].as_py()
+        if lo is None or (lo > -2**31 and hi < 2**31):
+            x = x.set_column(i, field.name, x.column(i).cast(pa.int32()))
+    return x
+
+
+def arrow2r(x: pa.Table | pa.RecordBatch) -> Any:
+    # R allocates an (empty) ArrowArrayStream, which pyarrow exports the
+    # table into, before R reads it into a data.frame
+    import pyarrow as pa
+    from .rutils import rcall_cached
+    reader = pa.RecordBatchReader.from_batches(x.schema, x.to_batches())
+    stream: Any = rcall_cached("nanoarrow::nanoarrow_allocate_array_stream")()
+    addr: str = rcall_cached("nanoarrow::nanoarrow_pointer_addr_chr")(stream)[0]
+    reader._export_to_c(int(addr))
+    return rcall_cached("as.data.frame")(stream)
+
+
+R2ARROW: str = """
+function(x, addr) {
+    stream <- nanoarrow::as_nanoarrow_array_stream(x)
+    nanoarrow::nanoarrow_pointer_export(stream, addr)
+    invisible(NULL)
+}
+"""
+
+
+def r2arrow(x: Any) -> pa.Table:
+    # pyarrow allocates an ArrowArrayStream, which R moves the stream of the
+    # data.frame into
+    import pyarrow as pa
+    from pyarrow.cffi import ffi
+    from .rutils import rcall_cached
+    stream = ffi.new("struct ArrowArrayStream*")
+    addr: int = int(ffi.cast("uintptr_t", stream))
+    rcall_cached(R2ARROW)(x, str(addr))
+    return pa.RecordBatchReader._import_from_c(addr).read_all()
+
+
+def r2pandas_arrow(x: Any) -> pd.DataFrame:
+    return r2arrow(x).to_pandas()
@@ -0,0 +1,126 @@
+# Calling an R function for many argument sets in a single round-trip. The
+# arguments are converted once, as columns (vectors or lists, with one element
+# per call), and the calls are run in R by `mapply()`, e.g.,
+#
+#   stats = wr.library("stats")
+#   stats.qnorm.batch([{"p": 0.9, "sd": 1}, {"p": 0.95, "sd": 2}])
+#   wr.vcall(stats.qnorm, p=np.array([0.9, 0.95]), sd=np.array([1, 2]))
+#
+# The results are stacked when they line up: scalars of the same type into a
+# vector, vectors of the same length and type into a matrix (one row per
+# call), and data frames into a single data frame. Otherwise they are
+# returned as a list
+from __future__ import annotations
+
+from collections.abc import Sized
+from typing import Any, Callable, Dict, List
+
+from .lazy_rexpr import has_lazy_args
+from .rthread import on_rthread, run_on_rthread
+from .utils import is_pandas
+
+
+BATCH_CALL: str = """
+function(f, args, more, simplify) {
+    out <- do.call(mapply, c(list(FUN = f), args,
+                             list(MoreArgs = more, SIMPLIFY = FALSE,
+                                  USE.NAMES = FALSE)))
+    if (!simplify || !length(out))
+        return(out)
+    if (all(vapply(out, is.data.frame, logical(1))))
+        return(tryCatch(do.call(rbind, out), error = function(e) out))
+    same_type <- length(unique(lapply(out, function(x) c(typeof(x), class(x))))) == 1L
+    if (same_type && is.atomic(out[[1]]) && all(vapply(out, function(x) is.null(dim(x)), logical(1)))) {
+        n <- lengths(out)
+        if (all(n == 1L))
+            return(do.call(c, unname(out)))
+        if (all(n == n[1]))
+            return(do.call(rbind, unname(out)))
+    }
+    out
+}
+"""
+
+
+def vcall(fn: Callable | str, _const: Dict[str, Any] | None = None,
+          _robject: bool = False, _simplify: bool = True, **columns) -> Any:
+    # calls `fn` once per element of the `columns`, which must be of equal
+    # length, i.e., `fn(**{k: v[i] for k, v in columns.items()}, **_const)`
+    # for every i. `fn` is a wrapped R function, or the name of one
+    if not on_rthread():
+        return run_on_rthread(vcall, fn, _const, _robject, _simplify, **columns)
+    from .convert_py2r import as_rvector, convert_pyobject2r
+    from .convert_r2py import convert_r2py
+    from .profiling import CallTimer, profiling_active
+    from .rmemory import after_call
+    from .robject import Robject
+    from .rutils import rcall_cached
+    import rpy2.rinterface as ri
+
+    if isinstance(fn, str):
+        from .function_wrapper import rfunc
+        fn = rfunc(fn)
+    const: Dict[str, Any] = dict(_const or {})
+    if not columns:
+        raise ValueError("At least one column of arguments must be given")
+    if has_lazy_args(columns) or has_lazy_args(const):
+        raise TypeError("Lazy arguments are not supported in batch calls")
+    for k, v in columns.items():
+        # `mapply()` iterates over data frames by column, and over matrices
+        # by element
+        if is_pandas(v, "DataFrame") or getattr(v, "ndim", 1) != 1:
+            raise TypeError(f"Column {k} must be one-dimensional, got {type(v).__name__}")
+        if not isinstance(v, Sized) or isinstance(v, (str, bytes)):
+            raise TypeError(f"Column {k} must be a sequence, got {type(v).__name__}")
+
+    name: str | None = getattr(fn, "__rname__", None)
+    timer = CallTimer(f"{name or '<anonymous>'}.batch") if profiling_active() else None
+    func: Any = getattr(fn, "__rfunc__", fn)
+    translate: Dict[str, str] = getattr(func, "_prm_translate", {})
+    rcolumns: List[Any] = [as_rvector(convert_pyobject2r(v)) for v in columns.values()]
+    rconst: List[Any] = [as_rvector(convert_pyobject2r(v)) for v in const.values()]
+    if timer is not None:
+        timer.converted(rcolumns, dict(zip(const, rconst)))
+    args = ri.ListSexpVector(rcolumns)
+    # as seen by `mapply()`, i.e., the `length()` of the R objects
+    lengths: List[int] = list(rcall_cached("function(x) lengths(x)")(args))
+    if len(set(lengths)) != 1:
+        raise ValueError(f"Columns must have the same length, got {lengths}")
+    args.names = ri.StrSexpVector([translate.get(k, k) for k in columns])
+    more = ri.ListSexpVector(rconst)
+    if const:
+        more.names = ri.StrSexpVector([translate.get(k, k) for k in const])
+
+    out: Any = rcall_cached(BATCH_CALL)(func, args, more, _simplify)
+    if timer is not None:
+        timer.called(out)
+    py_object: Any = Robject(out) if _robject else convert_r2py(out)
+    if timer is not None:
+        timer.finish()
+    after_call()
+    return py_object
+
+
+def batch(fn: Callable | str, rows: List[Dict[str, Any]], _robject: bool = False,
+          _simplify: bool = True, **const) -> Any:
+    # calls `fn(**row, **const)` for every row of `rows`, which must have the
+    # same keys, see `vcall()`
+    rows = list(rows)
+    if not rows:
+        return empty_robject() if _robject else []
+    keys: List[str] = list(rows[0])
+    columns: Dict[str, List[Any]] = {k: [] for k in keys}
+    for row in rows:
+        if row.keys() != columns.keys():
+            raise ValueError(f"All rows must have the same keys, got {list(row)} and {keys}")
+        for k, v in row.items():
+            columns[k].append(v)
+    return vcall(fn, _const=const, _robject=_robject, _simplify=_simplify, **columns)
+
+
+def empty_robject() -> Any:
+    if not on_rthread():
+        return run_on_rthread(empty_robject)
+    from .robject import Robject
+    import rpy2.rinterface as ri
+    return Robject(ri.ListSexpVector([]))
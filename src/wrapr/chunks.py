@@ -0,0 +1,110 @@
+# Applying R functions to a large input in chunks, such that only one chunk
+# (and its result) is held in R's memory at a time, e.g.,
+#
+#   for out in wr.map_chunks(dplyr.mutate, df, chunksize=10**6,
+#                            y=wr.lazily("x * 2")):
+#       ...
+#
+#   out = wr.map_chunks(GaussSuppression.SuppressDominantCells, df,
+#                       by="region", combine=True, ...)
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, List
+
+import numpy as np
+
+from .utils import is_pandas
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def map_chunks(fn: Callable | str, data: Any, *args,
+               chunksize: int | None = None, by: Any = None,
+               combine: bool = False, **kwargs) -> Iterator[Any] | Any:
+    # calls `fn(chunk, *args, **kwargs)` for every chunk of `data`, where
+    # `fn` is a (wrapped) R function, or the name of one. `data` is a
+    # DataFrame or numpy array, which is split into chunks of `chunksize`
+    # rows, or into the groups given by the column(s) `by` (packed into
+    # chunks of at most `chunksize` rows, if given). `data` can also be an
+    # iterable of chunks, e.g., a reader for a large file.
+    #
+    # The results are yielded as they are computed, or combined (with
+    # `combine=True`) by concatenating them. Only one chunk is in R at a
+    # time, but the combined results are all held in python until they are
+    # concatenated, so the peak memory use is that of the whole output. Use
+    # the iterator to process the results one at a time
+    if isinstance(fn, str):
+        from .function_wrapper import rfunc
+        fn = rfunc(fn)
+    results: Iterator[Any] = (fn(chunk, *args, **kwargs)
+                              for chunk in iter_chunks(data, chunksize, by))
+    return combine_chunks(results) if combine else results
+
+
+def iter_chunks(data: Any, chunksize: int | None = None,
+                by: Any = None) -> Iterator[Any]:
+    if by is not None:
+        if not is_pandas(data, "DataFrame"):
+            raise TypeError("`by` is only supported for DataFrames")
+        yield from iter_groups(data, by, chunksize)
+    elif is_pandas(data, "DataFrame", "Series") or isinstance(data, np.ndarray):
+        if chunksize is None:
+            raise ValueError("Either `chunksize` or `by` must be given")
+        for i in range(0, len(data), chunksize):
+            yield data[i:i + chunksize] if isinstance(data, np.ndarray) else \
+                data.iloc[i:i + chunksize]
+    else:
+        yield from data
+
+
+def iter_groups(data: pd.DataFrame, by: Any,
+                chunksize: int | None) -> Iterator[pd.DataFrame]:
+    # groups are never split, but small groups are packed together into
+    # chunks of at most `chunksize` rows
+    groups = data.groupby(by, sort=False, observed=True, dropna=False).indices
+    if chunksize is None:
+        for idx in groups.values():
+            yield data.iloc[idx]
+        return
+    pending: List[np.ndarray] = []
+    n: int = 0
+    for idx in groups.values():
+        if pending and n + len(idx) > chunksize:
+            yield data.iloc[np.concatenate(pending)]
+            pending, n = [], 0
+        pending.append(idx)
+        n += len(idx)
+    if pending:
+        yield data.iloc[np.concatenate(pending)]
+
+
+def combine_chunks(results: Iterable[Any]) -> Any:
+    # the results must all be DataFrames/Series, or all numpy arrays. The
+    # kind is checked as the results come in, such that a mismatch fails
+    # before the remaining chunks are computed
+    collected: List[Any] = []
+    kind: str | None = None
+    for x in results:
+        k: str = chunk_kind(x)
+        if kind is not None and k != kind:
+            raise TypeError(f"Cannot combine chunk results of kinds {kind} and {k}")
+        kind = k
+        collected.append(x)
+    match kind:
+        case None:
+            return None
+        case "pandas":
+            import pandas as pd
+            return pd.concat(collected, ignore_index=True)
+        case _:
+            return np.concatenate(collected)
+
+
+def chunk_kind(x: Any) -> str:
+    if is_pandas(x, "DataFrame", "Series"):
+        return "pandas"
+    if isinstance(x, np.ndarray):
+        return "numpy"
+    raise TypeError(f"Cannot combine chunk results of type {type(x).__name__}, "
+                    "use `combine=False`")
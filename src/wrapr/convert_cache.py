@@ -0,0 +1,176 @@
+# Cache of the R objects converted from numpy arrays and pandas DataFrames,
+# such that an object which is passed to R many times is only converted once.
+# Entries are keyed by the identity of the python object (and dropped when it
+# is garbage collected), and validated by a fingerprint of the object.
+#
+# By default only objects marked as immutable with `freeze()` are cached. With
+# `set_option("conversion_cache", "fingerprint")` any large array or
+# DataFrame is cached as well. The fingerprint then covers the data pointers,
+# shapes and strides, and a sample of the elements. This is a heuristic, and
+# may miss in-place modifications of elements which are not sampled
+import weakref
+import numpy as np
+
+from collections import OrderedDict
+from numpy.typing import NDArray
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from .options import OPTIONS
+from .utils import is_pandas
+
+
+# objects smaller than this are cheap to convert, and are only cached when
+# they are frozen
+MIN_BYTES: int = 1 << 16
+
+# number of elements sampled per array in the fingerprint
+SAMPLE_SIZE: int = 16
+
+FROZEN: Dict[int, weakref.ref] = {}
+
+
+def freeze(x: Any) -> Any:
+    # marks a numpy array or DataFrame as immutable, such that its conversion
+    # to R can be reused. numpy arrays are made read-only. DataFrames can't
+    # be made read-only, and must not be modified after they are frozen. As
+    # a safeguard, they are validated by the fingerprint of their columns
+    # (see `fingerprint()`), which catches added or replaced columns, and
+    # most in-place changes
+    if isinstance(x, np.ndarray):
+        x.flags.writeable = False
+    elif not is_pandas(x, "DataFrame"):
+        raise TypeError(f"Cannot freeze object of type {type(x).__name__}")
+    key: int = id(x)
+    FROZEN[key] = weakref.ref(x, lambda r: drop_ref(FROZEN, key, r))
+    return x
+
+
+def is_frozen(x: Any) -> bool:
+    ref: weakref.ref | None = FROZEN.get(id(x))
+    return ref is not None and ref() is x
+
+
+def drop_ref(d: Dict[int, Any], key: int, ref: weakref.ref) -> None:
+    # weakref callback, the id may already have been reused by a new object
+    entry: Any = d.get(key)
+    if entry is ref or (isinstance(entry, tuple) and entry[0] is ref):
+        d.pop(key)
+
+
+class ConversionCache:
+    """Identity-keyed cache, evicting the least recently used items when
+    the total size of the cached objects exceeds `maxbytes`."""
+    def __init__(self) -> None:
+        # id -> (weakref, fingerprint, R object, size)
+        self.items: OrderedDict = OrderedDict()
+        self.nbytes: int = 0
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, x: Any, fingerprint: Hashable) -> Any:
+        entry: Tuple | None = self.items.get(id(x))
+        if entry is None:
+            return None
+        ref, fp, robj, _ = entry
+        if ref() is not x or fp != fingerprint:
+            self.pop(id(x))
+            return None
+        self.items.move_to_end(id(x))
+        return robj
+
+    def put(self, x: Any, fingerprint: Hashable, robj: Any, size: int,
+            maxbytes: int) -> None:
+        key: int = id(x)
+        self.pop(key)
+        if size > maxbytes:
+            return
+        ref: weakref.ref = weakref.ref(x, lambda r: self.drop(key, r))
+        self.items[key] = (ref, fingerprint, robj, size)
+        self.nbytes += size
+        while self.nbytes > maxbytes:
+            self.pop(next(iter(self.items)))
+
+    def drop(self, key: int, ref: weakref.ref) -> None:
+        entry: Tuple | None = self.items.get(key)
+        if entry is not None and entry[0] is ref:
+            self.pop(key)
+
+    def pop(self, key: int) -> None:
+        entry: Tuple | None = self.items.pop(key, None)
+        if entry is not None:
+            self.nbytes -= entry[3]
+
+    def clear(self) -> None:
+        self.items.clear()
+        self.nbytes = 0
+
+
+CONVERSION_CACHE: ConversionCache = ConversionCache()
+
+
+def clear_conversion_cache() -> None:
+    CONVERSION_CACHE.clear()
+
+
+def cached_conversion(x: Any, convert: Callable[[Any], Any]) -> Any:
+    mode: str | None = OPTIONS["conversion_cache"]
+    if not mode:
+        return convert(x)
+    fp: Hashable | None = None
+    if is_frozen(x):
+        fp = ("frozen", x.shape if isinstance(x, np.ndarray) else
+              (x.shape, tuple(map(str, x.columns)), fingerprint(x)))
+    elif mode == "fingerprint" and object_nbytes(x) >= MIN_BYTES:
+        fp = fingerprint(x)
+    if fp is None:
+        return convert(x)
+
+    out: Any = CONVERSION_CACHE.get(x, fp)
+    if out is None:
+        out = convert(x)
+        CONVERSION_CACHE.put(x, fp, out, object_nbytes(x),
+                             maxbytes=OPTIONS["conversion_cache_bytes"])
+    return out
+
+
+def object_nbytes(x: Any) -> int:
+    if isinstance(x, np.ndarray):
+        return x.nbytes
+    return int(x.memory_usage(index=False, deep=False).sum())
+
+
+def fingerprint(x: Any) -> Hashable | None:
+    if isinstance(x, np.ndarray):
+        return array_fingerprint(x)
+    columns: list = []
+    for i in range(x.shape[1]):
+        fp: Hashable | None = column_fingerprint(x.iloc[:, i])
+        if fp is None:
+            return None
+        columns.append(fp)
+    return (tuple(map(str, x.columns)), x.shape, tuple(columns))
+
+
+def column_fingerprint(x: Any) -> Hashable | None:
+    # fingerprint of the numpy buffer backing a column, if any
+    import pandas as pd
+    if isinstance(x.dtype, pd.CategoricalDtype):
+        return ("category", id(x.dtype),
+                array_fingerprint(x.cat.codes.to_numpy()))
+    if isinstance(x.dtype, np.dtype):
+        return array_fingerprint(x.to_numpy(copy=False))
+    return None
+
+
+def array_fingerprint(x: NDArray) -> Hashable:
+    ptr: int = x.__array_interface__["data"][0]
+    sample: bytes | Tuple = b""
+    if x.size:
+        idx: NDArray = np.linspace(0, x.size - 1, min(SAMPLE_SIZE, x.size),
+                                   dtype=np.intp)
+        # the elements of object arrays are compared by identity, as they
+        # may not be hashable
+        sample = tuple(map(id, x.flat[idx])) if x.dtype.kind == "O" else \
+            x.flat[idx].tobytes()
+    return (ptr, x.shape, x.strides, x.dtype.str, sample)
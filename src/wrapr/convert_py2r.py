@@ -1,16 +1,31 @@
+# pandas and scipy are only imported when they are needed, see
+# `utils.loaded_module()`
+from __future__ import annotations
+
 import warnings
 from numpy._typing import NDArray
-import scipy
 import rpy2.robjects as ro
+import rpy2.rinterface as ri
 import numpy as np
-import pandas as pd
 
 from types import NoneType
 from collections import OrderedDict
-from typing import Any, Callable, Dict, List, Set, Tuple
-from rpy2.robjects import FloatVector, pandas2ri, numpy2ri
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Set, Tuple
+
+from .rutils import rcall_cached
+from .utils import is_pandas, is_sparse
+from .robject import Robject
+from .rlist import RList
+from .convert_cache import cached_conversion, object_nbytes
+from .arrow_transfer import arrow2r, is_arrow_table, pandas2r_arrow, try_arrow, use_arrow
+from .rbuffer import (
+    NA_INTEGER, NA_REAL, alloc_rvector, fits_rinteger, numpy2rvector,
+    numpy_rtype, rpy2py, rvector_buffer
+)
 
-from .rutils import rcall
+if TYPE_CHECKING:
+    import pandas as pd
+    import scipy
 
 type RBaseObject = (
         ro.FloatVector | ro.FloatVector | ro.IntVector | 
@@ -30,106 +45,317 @@ def convert_py2r(args: List[Any], kwargs: Dict[str, Any]) -> None:
 
 
 def convert_pyobject2r(x: Any) -> RBaseObject | PyDtype | Any:
+    # the converter is looked up by the exact type of x, and resolved (see
+    # `py2r_converter()`) once per type
+    convert: Callable | None = PY2R_DISPATCH.get(type(x))
+    if convert is None:
+        convert = PY2R_DISPATCH[type(x)] = py2r_converter(x)
+    return convert(x)
+
+
+# type -> converter, filled on first use of each type
+PY2R_DISPATCH: Dict[type, Callable[[Any], Any]] = {}
+
+
+def py2r_converter(x: Any) -> Callable[[Any], Any]:
+    # NOTE: the choice of converter must only depend on the type of x
     match x:
+        case Robject():
+            return lambda x: x.Robj
+        case RList():
+            return lambda x: x.robj
         case np.ndarray():
-            out = convert_numpy2r(x)
-        case scipy.sparse.coo_array() | scipy.sparse.coo_matrix():
-            out = convert_pysparsematrix(x)
+            return lambda x: cached_conversion(x, convert_numpy2r)
+        case _ if is_sparse(x):
+            return convert_pysparsematrix
         case OrderedDict() | dict():
-            out = dict2rlist(x)
+            return dict2rlist
         case list() | tuple() | set():
-            out = pylist2rlist(x)
-        case pd.DataFrame():
-            out = pandas2r(x)
+            return pylist2rlist
+        case _ if is_pandas(x, "DataFrame"):
+            return lambda x: cached_conversion(x, pandas2r)
+        case _ if is_arrow_table(x):
+            return arrow2r
+        case _ if is_pandas(x, "Series"):
+            return series2r
+        case _ if is_pandas(x, "Categorical"):
+            return categorical2factor
         case NoneType():
-            out = ro.NULL
+            return lambda x: ro.NULL
         case np.bool_():
-            out = bool(x)
+            return bool
         case np.int8() | np.int16() | np.int32() | np.int64():
-            out = int(x)
+            return int
         case np.float16() | np.float32() | np.float64() | np.float128():
-            out = float(x)
+            return float
         case np.str_() | np.bytes_():
-            out = str(x)
+            return str
         case _:
-            out = x
-    return out
+            return lambda x: x
 
 
+def as_rvector(x: Any) -> Any:
+    # R object for an (already converted) argument. Python scalars are
+    # converted directly, instead of through rpy2's conversion rules
+    match x:
+        case ri.Sexp():
+            return x
+        case bool():
+            return ri.BoolSexpVector([x])
+        case int() if -2**31 < x < 2**31:
+            return ri.IntSexpVector([x])
+        case int() | float():
+            return ri.FloatSexpVector([x])
+        case str():
+            return ri.StrSexpVector([x])
+        case _:
+            return ro.conversion.get_conversion().py2rpy(x)
+
 
 def convert_numpy2r(x: NDArray) -> RBaseObject:
     if not x.shape:
         x = x[np.newaxis]
+    rtype: ri.RTYPES | None = numpy_rtype(x)
+    if rtype is not None: # numeric and logical arrays, of any dimension
+        return rpy2py(numpy2rvector(x, rtype=rtype))
     match len(x.shape):
         case 0:
             raise ValueError("Unexpected shape of numpy array")
         case 1:
             return convert_numpy1D(x)
-        case 2:
-            return convert_numpy2D(x)
         case _:
             return convert_numpyND(x)
 
-       
+
 def convert_numpy1D(x: NDArray) -> RBaseObject:
     match x.dtype.kind:
-        case "b":
-            return ro.BoolVector(x)
-        case "i":
-            return ro.IntVector(x)
-        case "f":
-            return ro.FloatVector(x)
-        case "U" | "S":
-            return ro.StrVector(x)
-        case "O":
-            try: 
-                y = x.astype("U")
-            except:
-                warnings.warn("dtype = object is not supported, this will probaly not work")
-                y = convert_pyobject2r(x.tolist())
-            finally:
-                return ro.StrVector(y)
+        case "b" | "i" | "u" | "f":
+            return rpy2py(numpy2rvector(x))
+        case "U" | "S" | "O":
+            return convert_strings(x)
         case _:
             return x
 
 
+def convert_numpyND(x: NDArray) -> RBaseObject:
+    # R is column-major, so the array is flattened in Fortran order
+    y = convert_numpy1D(x.ravel(order="F"))
+    if not isinstance(y, ri.Sexp):
+        return x
+    y.do_slot_assign("dim", ri.IntSexpVector(x.shape))
+    return rpy2py(y)
 
-def convert_numpy2D(x: NDArray) -> RBaseObject:
-    flat_x: NDArray = x.flatten()
-    nrow, ncol = x.shape
-    y = convert_numpy1D(flat_x)
-    f: Callable = ro.r("matrix")
-    return f(y, nrow=nrow, ncol=ncol)
 
+def dict2rlist(x: Dict | OrderedDict) -> RBaseObject:
+    # dicts of scalars (of the same type) are named vectors, anything else
+    # is a named list
+    y: ri.SexpVector = pylist2rlist(list(x.values()))
+    y.do_slot_assign("names", ri.StrSexpVector([str(k) for k in x]))
+    return y
 
-def convert_numpyND(x: NDArray) -> RBaseObject:
-    flat_x: NDArray = x.flatten()
-    dim: Tuple = x.shape
-    y = convert_numpy1D(flat_x)
-    f: Callable = ro.r("array")
-    return f(y, dim = ro.IntVector(dim))
 
+def pylist2rlist(x: List | Tuple | Set) -> RBaseObject:
+    # sequences of scalars (of the same type) are converted to atomic
+    # vectors, where None is NA, anything else to an (unnamed) list
+    kind: str | None = scalar_kind(x)
+    if kind is None or not len(x):
+        cv = ro.conversion.get_conversion()
+        y = [convert_pyobject2r(v) for v in x]
+        return rpy2py(ri.ListSexpVector(
+            [v if isinstance(v, ri.Sexp) else cv.py2rpy(v) for v in y]
+        ))
+    return scalars2rvector(list(x), kind)
 
-def dict2rlist(x: Dict | OrderedDict) -> ro.ListVector:
-    return ro.ListVector({k: convert_pyobject2r(v) for k, v in x.items()})
 
+def scalar_kind(x: Iterable) -> str | None:
+    # the common type ("b", "i", "f" or "s") of the scalars in x, in a
+    # single pass. Integers and floats are combined as floats, otherwise
+    # mixed types (or non-scalars) give None
+    kind: str | None = None
+    for v in x:
+        match v:
+            case None:
+                continue
+            case bool() | np.bool_():
+                k = "b"
+            case int() | np.integer():
+                k = "i"
+            case float() | np.floating():
+                k = "f"
+            case str() | np.str_():
+                k = "s"
+            case _:
+                return None
+        if kind is None or kind == k:
+            kind = k
+        elif {kind, k} == {"i", "f"}:
+            kind = "f"
+        else:
+            return None
+    return "b" if kind is None else kind # only None's are logical NA's
 
-def pylist2rlist(x: List | Tuple | Set) -> ro.ListVector:
-    y: Dict[str, Any] = {str(k): v for k, v in enumerate(x)}
-    return ro.ListVector(dict2rlist(y))
 
+def scalars2rvector(x: List[Any], kind: str) -> RBaseObject:
+    match kind:
+        case "s":
+            return convert_strings(np.array(x, dtype=object))
+        case "b":
+            y = np.array([NA_INTEGER if v is None else v for v in x], dtype=np.int32)
+            return rpy2py(numpy2rvector(y, rtype=ri.RTYPES.LGLSXP))
+        case "i" if None not in x:
+            y = np.array(x)
+            if y.dtype.kind in "iu":
+                return rpy2py(numpy2rvector(y))
+            # too large for int64, stored as doubles
+    y = np.array([NA_REAL if v is None else v for v in x], dtype=np.float64)
+    if kind == "i" and fits_rinteger(y[~np.isnan(y)]):
+        y = np.where(np.isnan(y), NA_INTEGER, y).astype(np.int32)
+        return rpy2py(numpy2rvector(y, rtype=ri.RTYPES.INTSXP))
+    return rpy2py(numpy2rvector(y, rtype=ri.RTYPES.REALSXP))
 
-def convert_pysparsematrix(x: scipy.sparse.coo_array | scipy.sparse.coo_matrix):
-    try:
-        sparseMatrix: Callable = rcall("Matrix::sparseMatrix")
-        return sparseMatrix(i=ro.IntVector(x.row + 1),
-                            j=ro.IntVector(x.col + 1),
-                            x=ro.FloatVector(x.data),
-                            dims=ro.IntVector(x.shape))
-    except:
-        return x
+
+def convert_pysparsematrix(x: scipy.sparse.sparray | scipy.sparse.spmatrix) -> RBaseObject:
+    # fills the slots of the Matrix object directly, keeping the storage
+    # format (compressed column/row or triplets) of x, such that R doesn't
+    # have to sort and compress the entries again
+    dimnames: Tuple | None = getattr(x, "dimnames", None)
+    if x.format not in ("csc", "csr", "coo"):
+        x = x.tocsc()
+    if x.format != "coo" and not x.has_canonical_format:
+        x = x.copy()
+        x.sum_duplicates()
+    is_logical: bool = x.dtype.kind == "b"
+    xtype: str = "l" if is_logical else "d"
+    rtype: ri.RTYPES = ri.RTYPES.LGLSXP if is_logical else ri.RTYPES.REALSXP
+
+    match x.format:
+        case "csc":
+            y = new_rmatrix(f"{xtype}gCMatrix")
+            y.do_slot_assign("i", numpy2rvector(x.indices))
+            y.do_slot_assign("p", numpy2rvector(x.indptr))
+        case "csr":
+            y = new_rmatrix(f"{xtype}gRMatrix")
+            y.do_slot_assign("j", numpy2rvector(x.indices))
+            y.do_slot_assign("p", numpy2rvector(x.indptr))
+        case "coo":
+            y = new_rmatrix(f"{xtype}gTMatrix")
+            y.do_slot_assign("i", numpy2rvector(x.row))
+            y.do_slot_assign("j", numpy2rvector(x.col))
+
+    y.do_slot_assign("x", numpy2rvector(x.data, rtype=rtype))
+    y.do_slot_assign("Dim", ri.IntSexpVector(x.shape))
+    if dimnames is not None:
+        y.do_slot_assign("Dimnames", ri.ListSexpVector([
+            ro.NULL if d is None else ri.StrSexpVector([str(v) for v in d])
+            for d in dimnames
+            ]))
+    return y
+
+
+def new_rmatrix(rclass: str) -> ro.methods.RS4:
+    # empty object of one of the classes in the Matrix package
+    new: Callable = rcall_cached(
+        'function(cls) methods::new(methods::getClass(cls, where = asNamespace("Matrix")))'
+    )
+    return new(rclass)
 
 
 def pandas2r(x: pd.DataFrame) -> RBaseObject:
-    return ro.DataFrame({k: convert_pyobject2r(x[k].to_numpy()) for k in x})
+    # build the data.frame (a named list of columns) directly, instead of
+    # going through R's data.frame(). The row names are stored in R's compact
+    # form c(NA, -n), as data.frame() does for automatic row names
+    if x.columns.is_unique and use_arrow(object_nbytes(x)):
+        y: Any = try_arrow(pandas2r_arrow, x)
+        if y is not None:
+            return y
+    y = ri.ListSexpVector([series2r(v) for _, v in x.items()])
+    y.names = ri.StrSexpVector([str(k) for k in x.columns])
+    y.do_slot_assign("class", ri.StrSexpVector(["data.frame"]))
+    y.do_slot_assign("row.names", ri.IntSexpVector([NA_INTEGER, -len(x)]))
+    return rpy2py(y)
+
+
+def series2r(x: pd.Series) -> RBaseObject:
+    import pandas as pd
+    match x.dtype:
+        case pd.CategoricalDtype():
+            y = categorical2factor(x.array)
+        case pd.BooleanDtype():
+            y = numpy2rvector(x.to_numpy(dtype="int32", na_value=NA_INTEGER),
+                              rtype=ri.RTYPES.LGLSXP)
+        case dtype if pd.api.types.is_extension_array_dtype(dtype) and dtype.kind in "iu":
+            y = nullable_int2r(x)
+        case dtype if pd.api.types.is_extension_array_dtype(dtype) and dtype.kind == "f":
+            y = numpy2rvector(x.to_numpy(dtype="float64", na_value=np.nan))
+        case dtype if isinstance(dtype, pd.StringDtype) or dtype == object:
+            y = convert_strings(x.to_numpy(dtype=object, na_value=None))
+        case _:
+            y = convert_pyobject2r(x.to_numpy())
+
+    if not isinstance(y, ri.Sexp): # e.g., datetimes
+        from rpy2.robjects import pandas2ri
+        with (ro.default_converter + pandas2ri.converter).context():
+            y = ro.conversion.get_conversion().py2rpy(x)
+    return rpy2py(y)
+
+
+def nullable_int2r(x: pd.Series) -> RBaseObject:
+    values: NDArray = x.to_numpy(dtype=x.dtype.numpy_dtype, na_value=0)
+    if numpy_rtype(values) != ri.RTYPES.INTSXP:
+        return numpy2rvector(x.to_numpy(dtype="float64", na_value=np.nan))
+    values = values.astype("int32")
+    values[x.isna().to_numpy()] = NA_INTEGER
+    return numpy2rvector(values)
+
+
+def categorical2factor(x: pd.Categorical) -> RBaseObject:
+    # the (0-based) codes of the categorical are the (1-based) codes of the
+    # factor, so the levels don't have to be matched again
+    codes: NDArray = x.codes
+    y: ri.SexpVector = alloc_rvector(ri.RTYPES.INTSXP, len(codes))
+    if len(codes):
+        dest: NDArray = rvector_buffer(y)
+        np.add(codes, 1, out=dest, dtype=np.int32, casting="unsafe")
+        dest[codes < 0] = NA_INTEGER
+    rclass: List[str] = ["ordered", "factor"] if x.ordered else ["factor"]
+    y.do_slot_assign("levels", ri.StrSexpVector([str(c) for c in x.categories]))
+    y.do_slot_assign("class", ri.StrSexpVector(rclass))
+    return rpy2py(y)
+
+
+# `levels[index]`, where index is 1-based
+RSUBSET: str = "function(levels, index) levels[index]"
+
+
+def convert_strings(x: NDArray) -> RBaseObject:
+    # x is a string or object array, where missing values are None (or NaN).
+    # Each distinct string is converted to R (i.e., to a CHARSXP) once, and
+    # the vector is built by indexing the distinct strings in R, which only
+    # copies pointers to the shared CHARSXPs
+    codes, levels = factorize_strings(x)
+    if len(levels) == len(codes):
+        # all distinct, the levels are put in the order of x (np.unique sorts
+        # them)
+        return rpy2py(ri.StrSexpVector([levels[i] for i in codes]))
+    # missing values are the first level
+    rlevels = ri.StrSexpVector([ri.NA_Character] + levels)
+    index = alloc_rvector(ri.RTYPES.INTSXP, len(codes))
+    np.add(codes, 2, out=rvector_buffer(index), casting="unsafe")
+    return rcall_cached(RSUBSET)(rlevels, index)
+
+
+def factorize_strings(x: NDArray) -> Tuple[NDArray, List[str]]:
+    # (0-based) codes of the distinct strings in x, where missing values
+    # are -1, and the distinct strings
+    x = x.ravel()
+    match x.dtype.kind:
+        case "U" | "S":
+            levels, codes = np.unique(x, return_inverse=True)
+            if x.dtype.kind == "S":
+                levels = np.char.decode(levels, "utf-8")
+            return codes, levels.tolist()
+        case _:
+            import pandas as pd
+            codes, levels = pd.factorize(x, use_na_sentinel=True)
+            return codes, [v if isinstance(v, str) else str(v) for v in levels]
 
@@ -1,52 +1,84 @@
-import pandas as pd
+# pandas and scipy are only imported when they are needed, see
+# `utils.loaded_module()`
+from __future__ import annotations
+
 import numpy as np
-import scipy
 
 import rpy2.robjects as ro
+import rpy2.rinterface as ri
 import rpy2.robjects.vectors as vc
 import rpy2.rlike.container as rcnt
 
 from numpy.typing import NDArray
-from typing import Any, Callable, Dict, List, OrderedDict, Set, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, OrderedDict, Set, Tuple
 from copy import Error
-from rpy2.robjects import pandas2ri, numpy2ri, rpy2
+from rpy2.robjects import rpy2
 
-from .nputils import np_collapse
+from .nputils import np_collapse, LabelledArray
+from .options import get_option
+from .rbuffer import NA_INTEGER, RBUFFER_TYPES, rpy2py, rvector_buffer, rvector_view
 from .lazy_rexpr import lazily, lazy_wrap
-from .rutils import rcall
+from .rutils import rcall_cached
+from .utils import is_pandas
+from .arrow_transfer import r2pandas_arrow, try_arrow, use_arrow
+from .rlist import RList
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 def convert_r2py(x: Any) -> Any:
+    # the converter is looked up by the exact type of x, and resolved (see
+    # `r2py_converter()`) once per type
+    convert: Callable | None = R2PY_DISPATCH.get(type(x))
+    if convert is None:
+        convert = R2PY_DISPATCH[type(x)] = r2py_converter(x)
+    return convert(x)
+
+
+# type -> converter, filled on first use of each type
+R2PY_DISPATCH: Dict[type, Callable[[Any], Any]] = {}
+
+
+def r2py_converter(x: Any) -> Callable[[Any], Any]:
+    # NOTE: the choice of converter must only depend on the type of x
     match x:
         case str() | int() | bool() | float():
-            return x
+            return lambda x: x
         case rpy2.rinterface_lib.sexp.NULLType():
-            return None
+            return lambda x: None
         case ro.methods.RS4():
-            return convert_s4(x)
+            return convert_s4
         case vc.DataFrame():
-            return convert_pandas(x)
+            return convert_pandas
+        case vc.FactorVector():
+            return factor2categorical
         case vc.Vector() | vc.Matrix() | vc.Array() if not is_rlist(x):
-            return convert_numpy(x)
-        case list():
-            return convert_list(x)
-        case tuple(): 
-            return convert_list(x)
+            return convert_numpy
+        case list() | tuple():
+            return convert_list
         case rcnt.OrdDict():
-            return convert_dict(x, is_RDict=True)
+            return lambda x: convert_dict(x, is_RDict=True)
         case dict():
-            return convert_dict(x)
-        case pd.DataFrame():
-            return x
+            return convert_dict
+        case _ if is_pandas(x, "DataFrame"):
+            return lambda x: x
         case np.ndarray():
-            if not is_valid_numpy(x):
-                return attempt_pandas_conversion(x)
-            return filter_numpy(x)
+            return lambda x: (filter_numpy(x) if is_valid_numpy(x) else
+                              attempt_pandas_conversion(x))
         case vc.ListSexpVector() | vc.ListVector():
-            return convert_rlist2py(x)
+            return convert_rlist2py
+        case ri.SexpVector() | ri.SexpS4():
+            # rinterface-level objects, e.g., from `rcall_cached()` helpers
+            return convert_rinterface
         case _:
-            return generic_conversion(x)
-        
+            return generic_conversion
+
+
+def convert_rinterface(x: ri.Sexp) -> Any:
+    y: Any = rpy2py(x)
+    return generic_conversion(x) if type(y) is type(x) else convert_r2py(y)
+
 
 def convert_list(X: List | Tuple) -> Any:
     out = [convert_r2py(x) for x in X]
@@ -56,11 +88,15 @@ def convert_list(X: List | Tuple) -> Any:
        
 
 def convert_rlist2py(X: vc.ListVector | vc.ListSexpVector) -> Any:
-    names = convert_numpy(X.names)
-    if names is not None and len(names):
-        return convert_dict({n: x for n, x in zip(names, X)})
-    else:
-        return convert_list([x for x in X])
+    # elements are converted on access, unless the `lazy_lists` option is
+    # disabled
+    out: RList = RList(X)
+    return out if get_option("lazy_lists") else out.to_py()
+
+
+def is_plain_rlist(X: Any) -> bool:
+    # lists which are converted by `convert_rlist2py()`
+    return is_rlist(X) and not isinstance(X, (vc.DataFrame, ro.methods.RS4))
 
 
 def is_rlist(X: Any) -> bool:
@@ -90,6 +126,9 @@ def convert_dict(X: Dict | OrderedDict,
 def convert_numpy(x: vc.Vector | NDArray) -> NDArray | None:
     if isinstance(x, rpy2.rinterface_lib.sexp.NULLType):
         return None
+    if (get_option("zero_copy") and isinstance(x, ri.SexpVector) and
+            x.typeof in RBUFFER_TYPES):
+        return filter_numpy(label_numpy(rvector_view(x), x))
     match x: # this should be expanded upon
         case vc.BoolVector() | vc.BoolArray() | vc.BoolMatrix():
             dtype = "bool"
@@ -97,6 +136,10 @@ def convert_numpy(x: vc.Vector | NDArray) -> NDArray | None:
             dtype = "float"
         case vc.IntVector() | vc.IntArray() | vc.IntMatrix():
             dtype = "int"
+        case vc.StrArray() | vc.StrMatrix():
+            dtype = "U"
+        case vc.StrVector() if get_option("string_mode") != "U":
+            return filter_numpy(convert_rstrings(x))
         case vc.StrArray() | vc.StrVector() | vc.StrMatrix():
             dtype = "U"
         case _:
@@ -106,6 +149,53 @@ def convert_numpy(x: vc.Vector | NDArray) -> NDArray | None:
     return filter_numpy(y)
 
 
+# the distinct (non-missing) strings of x, and the (1-based) index of each
+# element of x in them
+STRING_CODES: str = """
+function(x) {
+    levels <- unique(x)
+    levels <- levels[!is.na(levels)]
+    list(levels, match(x, levels))
+}
+"""
+
+
+def convert_rstrings(x: vc.StrVector) -> Any:
+    # each distinct string is converted to python once, and the elements
+    # refer to the same python objects (or categories), instead of being
+    # stored in a fixed-width unicode array, see the `string_mode` option
+    import pandas as pd
+    rlevels, rcodes = rcall_cached(STRING_CODES)(x)
+    levels: List[str] = list(rlevels)
+    codes: NDArray = np.array(rvector_buffer(rcodes))
+    codes = np.where(codes == NA_INTEGER, -1, codes - 1)
+    match get_option("string_mode"):
+        case "category":
+            return pd.Categorical.from_codes(codes, categories=levels,
+                                             validate=False)
+        case mode:
+            # missing values are the last element, such that code -1 is None
+            values: NDArray = np.empty(len(levels) + 1, dtype=object)
+            values[:-1] = levels
+            values[-1] = None
+            y: NDArray = values[codes]
+            return pd.array(y, dtype="string") if mode == "string" else y
+
+
+def label_numpy(y: NDArray, x: vc.Vector) -> NDArray:
+    # carry over the dimnames of R matrices and arrays
+    if y.ndim < 2 or "dimnames" not in x.list_attrs():
+        return y
+    dimnames = tuple(convert_dimnames(d) for d in x.do_slot("dimnames"))
+    return LabelledArray(y, dimnames=dimnames)
+
+
+def convert_dimnames(x: Any) -> NDArray | None:
+    if isinstance(x, rpy2.rinterface_lib.sexp.NULLType):
+        return None
+    return np.asarray(x, dtype="U")
+
+
 def filter_numpy(x: NDArray) -> NDArray | int | str | float | bool:
     # sometimes a numpy array will have one element with shape (,)
     # this should be (1,)
@@ -123,16 +213,45 @@ def is_valid_numpy(x: NDArray) -> bool:
 
 
 def convert_pandas(df: vc.DataFrame) -> pd.DataFrame:
-    colnames = df.names
-    df_dict = {c: convert_numpy(x) for c, x in zip(colnames, list(df))}
-    return pd.DataFrame(df_dict) 
+    import pandas as pd
+    # estimated size, assuming 8 bytes per element
+    if use_arrow(8 * df.nrow * df.ncol):
+        out: pd.DataFrame | None = try_arrow(r2pandas_arrow, df)
+        if out is not None:
+            return out
+    colnames = list(df.names)
+    columns = [convert_rcolumn(x) for x in df]
+    # keyed by position, so duplicated column names are kept
+    out = pd.DataFrame(dict(enumerate(columns)), index=pd.RangeIndex(df.nrow),
+                       copy=False)
+    out.columns = colnames
+    return out
+
+
+def convert_rcolumn(x: Any) -> Any:
+    match x:
+        case vc.FactorVector():
+            return factor2categorical(x)
+        case vc.Vector() if not is_rlist(x):
+            return convert_numpy(x)
+        case _:
+            return convert_r2py(x)
+
 
-    with (ro.default_converter + pandas2ri.converter).context():
-        pd_df = ro.conversion.get_conversion().rpy2py(df)
-    return pd_df
+def factor2categorical(x: vc.FactorVector) -> pd.Categorical:
+    import pandas as pd
+    # the (1-based) codes of the factor are the (0-based) codes of the
+    # categorical, so the levels don't have to be matched again
+    codes: NDArray = np.asarray(x)
+    codes = np.where(codes == NA_INTEGER, -1, codes - 1)
+    levels: NDArray = np.asarray(x.levels, dtype="U")
+    return pd.Categorical.from_codes(codes, categories=levels, 
+                                     ordered="ordered" in x.rclass,
+                                     validate=False)
 
 
 def attempt_pandas_conversion(x: Any) -> Any:
+    import pandas as pd
     try: 
         return pd.DataFrame(x)
     except:
@@ -150,18 +269,70 @@ def generic_conversion(x: Any) -> Any:
 
 
 def convert_s4(x: ro.methods.RS4) -> Any:
-    rclass = get_rclass(x)
-    if rclass is None:
-        return generic_conversion(x)
-
-    match np_collapse(rclass):
-        case "dgCMatrix": # to do: put this in a seperate function
-            dense = convert_numpy(as_matrix(x))
-            sparse = scipy.sparse.coo_matrix(dense)
-            return sparse
+    rclass: str = np_collapse(np.asarray(x.rclass, dtype="U"))
+
+    match rclass:
+        case ("dgCMatrix" | "lgCMatrix" | "ngCMatrix" | 
+              "dgRMatrix" | "lgRMatrix" | "ngRMatrix" |
+              "dgTMatrix" | "lgTMatrix" | "ngTMatrix" |
+              "ddiMatrix" | "ldiMatrix"):
+            return convert_rsparsematrix(x, rclass)
+        case _ if is_rsparsematrix(x):
+            # e.g., symmetric and triangular matrices. Some classes (e.g.,
+            # indMatrix) are already general, and are left as they are
+            y: ro.methods.RS4 = as_general_matrix(x)
+            if np_collapse(np.asarray(y.rclass, dtype="U")) != rclass:
+                return convert_s4(y)
+            return generic_conversion(x)
         case _:
             return generic_conversion(x)
 
 
+def convert_rsparsematrix(x: ro.methods.RS4, rclass: str) -> Any:
+    # the slots of the Matrix object are read directly, so that memory
+    # usage and time is O(nnz), and not O(nrow * ncol)
+    import scipy.sparse
+    shape: Tuple[int, int] = tuple(int(d) for d in x.do_slot("Dim"))
+    match rclass[1:]:
+        case "diMatrix":
+            n: int = shape[0]
+            is_unit: bool = x.do_slot("diag")[0] == "U"
+            data = sparse_values(x, rclass, nnz=n, is_unit=is_unit)
+            index: NDArray = np.arange(n + 1, dtype=np.int32)
+            out = scipy.sparse.csc_array((data, index[:-1], index), shape=shape)
+        case "gCMatrix":
+            i, p = rslot_numpy(x, "i"), rslot_numpy(x, "p")
+            data = sparse_values(x, rclass, nnz=len(i))
+            out = scipy.sparse.csc_array((data, i, p), shape=shape)
+        case "gRMatrix":
+            j, p = rslot_numpy(x, "j"), rslot_numpy(x, "p")
+            data = sparse_values(x, rclass, nnz=len(j))
+            out = scipy.sparse.csr_array((data, j, p), shape=shape)
+        case _: # gTMatrix
+            i, j = rslot_numpy(x, "i"), rslot_numpy(x, "j")
+            data = sparse_values(x, rclass, nnz=len(i))
+            out = scipy.sparse.coo_array((data, (i, j)), shape=shape)
+    # NOTE: the Dimnames are dropped, scipy's sparse arrays have no labels
+    return out
+
+
+def sparse_values(x: ro.methods.RS4, rclass: str, nnz: int,
+                  is_unit: bool = False) -> NDArray:
+    if rclass.startswith("n") or is_unit: # pattern or unit-diagonal
+        return np.ones(nnz, dtype=bool if rclass[0] in "ln" else float)
+    if rclass.startswith("l"):
+        return rvector_view(x.do_slot("x")).astype(bool)
+    return rslot_numpy(x, "x")
+
+
+def rslot_numpy(x: ro.methods.RS4, name: str) -> NDArray:
+    y: NDArray = rvector_view(x.do_slot(name))
+    return y if get_option("zero_copy") else y.copy()
+
+
+def is_rsparsematrix(x: ro.methods.RS4) -> bool:
+    return bool(rcall_cached("methods::is")(x, "sparseMatrix")[0])
 
 
+def as_general_matrix(x: ro.methods.RS4) -> ro.methods.RS4:
+    return rcall_cached("methods::as")(x, "generalMatrix")
@@ -0,0 +1,122 @@
+# On-disk cache of the (converted) datasets of R packages, keyed by the
+# package name, its installed version, the versions of R (see
+# `manifest.package_key()`), the version of wrapr and the options changing
+# how objects are converted, and the name of the dataset. DataFrames are
+# stored as uncompressed Feather files (if pyarrow is installed), and numpy
+# arrays as .npy files. Both are memory-mapped when they are loaded, such that
+# a dataset which has been used once can be loaded in a new process without
+# starting R. numpy arrays are returned as (copy-on-write) views on the file,
+# read-only with `zero_copy` as when they are converted from R, while the
+# columns of DataFrames are copied by pyarrow when converting the table to
+# pandas.
+#
+# Other objects (e.g., lists and scalars) are not cached, and are fetched
+# from R every time
+from __future__ import annotations
+
+import os
+import re
+import json
+import hashlib
+import importlib.metadata
+import importlib.util
+
+from functools import cache
+from pathlib import Path
+from typing import Any, List, Tuple
+
+import numpy as np
+
+from .manifest import cache_dir, find_description, package_key, read_description
+from .options import OPTIONS
+from .utils import is_pandas
+
+
+def dataset_path(dataset: str, env_name: str) -> Path | None:
+    description_path: str | None = find_description(env_name)
+    if description_path is None:
+        return None
+    key: str = package_key(env_name, read_description(description_path))
+    return cache_dir() / "datasets" / key / conversion_key() / \
+        re.sub(r"[^\w.-]", "_", dataset)
+
+
+# options which change the converted form of a dataset
+CONVERSION_OPTIONS: Tuple[str, ...] = ("zero_copy", "string_mode")
+
+
+def conversion_key() -> str:
+    config: List[Any] = [wrapr_version()] + [OPTIONS[k] for k in CONVERSION_OPTIONS]
+    return hashlib.sha1(json.dumps(config).encode()).hexdigest()[:16]
+
+
+@cache
+def wrapr_version() -> str:
+    try:
+        return importlib.metadata.version("ssb-wrapr-python")
+    except importlib.metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def with_suffix(path: Path, suffix: str) -> Path:
+    # appended, as dataset names may contain dots (e.g., `state.name`)
+    return path.with_name(path.name + suffix)
+
+
+def read_dataset(dataset: str, env_name: str) -> Any | None:
+    # the cached dataset, or None if it isn't cached
+    if not OPTIONS["data_cache"]:
+        return None
+    path: Path | None = dataset_path(dataset, env_name)
+    if path is None:
+        return None
+    try:
+        if with_suffix(path, ".npy").is_file():
+            return np.load(with_suffix(path, ".npy"),
+                           mmap_mode="r" if OPTIONS["zero_copy"] else "c")
+        if with_suffix(path, ".feather").is_file() and \
+                importlib.util.find_spec("pyarrow") is not None:
+            import pyarrow.feather
+            table = pyarrow.feather.read_table(with_suffix(path, ".feather"),
+                                               memory_map=True)
+            return table.to_pandas(split_blocks=True)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def write_dataset(x: Any, dataset: str, env_name: str) -> None:
+    # the cache is an optimization, so failing to write it is not an error
+    if not OPTIONS["data_cache"]:
+        return None
+    path: Path | None = dataset_path(dataset, env_name)
+    if path is None:
+        return None
+    # subclasses (e.g., LabelledArray) would lose their attributes
+    if type(x) is np.ndarray and not x.dtype.hasobject:
+        write_atomic(with_suffix(path, ".npy"), lambda f: np.save(f, x))
+    elif is_pandas(x, "DataFrame") and cacheable_frame(x) and \
+            importlib.util.find_spec("pyarrow") is not None:
+        import pyarrow.feather
+        write_atomic(with_suffix(path, ".feather"), lambda f:
+                     pyarrow.feather.write_feather(x, f, compression="uncompressed"))
+
+
+def cacheable_frame(x: Any) -> bool:
+    # Feather requires unique string column names
+    return x.columns.is_unique and all(isinstance(c, str) for c in x.columns)
+
+
+def write_atomic(path: Path, write: Any) -> None:
+    tmp: Path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "wb") as f:
+            write(f)
+        os.replace(tmp, path)
+    except Exception:
+        # e.g., columns pyarrow can't convert
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
@@ -1,13 +1,21 @@
 import rpy2.robjects as ro
+import rpy2.rinterface as ri
 import numpy as np
 
+from functools import partial
 from numpy.typing import NDArray
 from typing import Any, Callable, Dict, List
-from .convert_py2r import convert_py2r
+from .batch import batch
+from .convert_py2r import as_rvector, convert_pyobject2r
 from .convert_r2py import convert_r2py
-from .rutils import rcall
-from .lazy_rexpr import lazy_wrap
+from .rutils import RCACHES, rcall_cached
+from .utils import LRUCache
+from .lazy_rexpr import has_lazy_args, lazy_wrap
+from .rmemory import after_call
+from .rbuffer import rpy2py
 from .robject import Robject
+from .profiling import CallTimer, profiling_active
+from .rthread import on_rthread, run_on_rthread
 
 # def robjectwrap(py_object: Any, r_object: Any = None) -> Any:
 #     if py_object is None:
@@ -43,19 +51,38 @@ from .robject import Robject
 #         kwargs[k] = strip_RobjectWrapper(v)
 
 
-def wrap_rfunc(func: Callable | Any, name: str | None) -> Callable | Any:
-    # should be a Callable, but may f-up (thus Any)
+def wrap_rfunc(func: Callable | Any, name: str | None,
+               robject: bool = False) -> Callable | Any:
+    # should be a Callable, but may f-up (thus Any). If `robject` is True
+    # (or `_robject=True` is passed to the call) the result is returned as an
+    # `Robject` handle, instead of being converted to python
     if not callable(func):
         return None
+    plan: CallPlan = CallPlan(func)
 
-    def wrap(*args, **kwargs):
-        args = list(args) if args is not None else args # make args mutable
+    def wrap(*args, _robject: bool = robject, **kwargs):
+        if not on_rthread():
+            return run_on_rthread(wrap, *args, _robject=_robject, **kwargs)
+        timer = CallTimer(name) if profiling_active() else None
         # strip_args(args=args, kwargs=kwargs)
-        convert_py2r(args=args, kwargs=kwargs)
-        lazyfunc = lazy_wrap(args=args, kwargs=kwargs, func=func,
-                             func_name=name)
-        r_object: Any = lazyfunc(*args, **kwargs)
-        py_object = convert_r2py(r_object)
+        args = [convert_pyobject2r(x) for x in args]
+        for k, v in kwargs.items():
+            kwargs[k] = convert_pyobject2r(v)
+        if timer is not None:
+            timer.converted(args, kwargs)
+        # positional lazy arguments are rejected by `lazy_wrap()`
+        if has_lazy_args(kwargs) or has_lazy_args(args):
+            lazyfunc = lazy_wrap(args=args, kwargs=kwargs, func=func,
+                                 func_name=name)
+            r_object: Any = lazyfunc(*args, **kwargs)
+        else:
+            r_object: Any = plan(args, kwargs)
+        if timer is not None:
+            timer.called(r_object)
+        py_object = Robject(r_object) if _robject else convert_r2py(r_object)
+        if timer is not None:
+            timer.finish()
+        after_call()
         # return robjectwrap(py_object, r_object)
         return py_object
 
@@ -63,14 +90,47 @@ def wrap_rfunc(func: Callable | Any, name: str | None) -> Callable | Any:
         wrap.__doc__ = func.__doc__
     except ro.HelpNotFoundError:
         pass
+    # the R function, and calls for many argument sets at once, see `batch`
+    wrap.__rfunc__ = func
+    wrap.__rname__ = name
+    wrap.batch = partial(batch, wrap, _robject=robject)
     return wrap
 
 
+class CallPlan:
+    # Precomputed parts of calling an R function, replacing the per-call
+    # work of rpy2's `SignatureTranslatedFunction.__call__`: keyword
+    # arguments are translated (e.g., `na_rm` -> `na.rm`) through a cached
+    # mapping, arguments which already are R objects are passed as-is, and
+    # python scalars are converted directly
+    def __init__(self, func: Callable | Any) -> None:
+        self.func = func
+        self.translate: Dict[str, str] = dict(getattr(func, "_prm_translate", {}))
+        # the closure is called at the rinterface level, unless it is some
+        # other callable
+        self.direct: bool = isinstance(func, ri.SexpClosure)
+
+    def __call__(self, args: List[Any], kwargs: Dict[str, Any]) -> Any:
+        if not self.direct:
+            return self.func(*args, **kwargs)
+        args = [as_rvector(x) for x in args]
+        kwargs = {self.translate.get(k, k): as_rvector(v) for k, v in kwargs.items()}
+        return rpy2py(ri.SexpClosure.__call__(self.func, *args, **kwargs))
+
+
+RFUNC_CACHE = LRUCache(maxsize=256)
+RCACHES.append(RFUNC_CACHE)
+
+
 def rfunc(name: str) -> Callable | Any:
     # Function for getting r-function from global environment
     # BEWARE: THIS FUNCTION WILL TRY TO CONVERT ARGS GOING BOTH IN AND OUT!
     # This function must not be used in Rpy-in functions
-    return wrap_rfunc(rcall(name), name=name)
+    fun: Callable | Any = RFUNC_CACHE.get(name)
+    if fun is None:
+        fun = wrap_rfunc(rcall_cached(name), name=name)
+        RFUNC_CACHE.put(name, fun)
+    return fun
 
 
 def get_rclass(x: Any) -> NDArray[np.unicode_] | None:
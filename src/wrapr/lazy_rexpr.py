@@ -2,8 +2,8 @@
 # in the python runtime environment, but instead lazily in the R runtime
 # environment
 from collections.abc import Callable
-from typing import Any, Dict, List
-from .rutils import rcall
+from typing import Any, Dict, List, Tuple
+from .utils import LRUCache, RCACHES
 
 
 class lazily():
@@ -11,26 +11,82 @@ class lazily():
         if not isinstance(expr, str):
             raise TypeError("lazy-expr must be in the form of a string")
         self.expr = expr
+        self.__rexpr = None
 
     def __str__(self) -> str:
         return self.expr
 
+    @property
+    def rexpr(self) -> Any:
+        # parsed once, on first use, such that creating a lazy expression
+        # doesn't start R
+        if self.__rexpr is None:
+            self.__rexpr = parse_rexpr(self.expr)
+        return self.__rexpr
+
+
+def parse_rexpr(expr: str) -> Any:
+    import rpy2.rinterface as ri
+    parsed = ri.parse(expr)
+    if len(parsed) != 1:
+        raise ValueError(f"lazy-expr must be a single R expression, got: {expr}")
+    return parsed[0]
+
+
+# closures calling a function with (some of) its arguments given as
+# unevaluated R expressions, keyed by the function and the lazy arguments
+LAZY_CACHE = LRUCache(maxsize=128)
+RCACHES.append(LAZY_CACHE)
+
+# the function object itself is put into the call, so unnamed functions
+# work as well as named ones. The lazy arguments are evaluated in `env`, the
+# global environment or that of the current `rmemory.scope()`
+LAZY_CLOSURE: str = """
+function(f, args, env) {
+    g <- function(...) NULL
+    body(g) <- as.call(c(list(f, quote(...)), args))
+    environment(g) <- env
+    g
+}
+"""
+
 
 def lazy_wrap(args: List[Any], kwargs: Dict[str, Any],
               func: Callable, func_name: str | None) -> Callable | Any:
-    lazy_arg_exprs: List[str] = []
     for x in args:
         if isinstance(x, lazily):
             raise TypeError(f"Lazy argument needs to be a keyword argument, {x} is unnamed")
-    for k, v in kwargs.copy().items():
-        if isinstance(v, lazily):
-            lazy_arg_exprs.append(f"{k} = {str(v)}")
-            del kwargs[k]
-
-    if not lazy_arg_exprs:
+    if not has_lazy_args(kwargs):
         return func
-    if func_name is None or func_name == "":
-        raise ValueError("Lazy expressions not supported for unnamed functions")
-    return rcall(f"function(...) {func_name}(..., {",".join(lazy_arg_exprs)})")
+    lazy_args: Dict[str, lazily] = {k: v for k, v in kwargs.items()
+                                    if isinstance(v, lazily)}
+    for k in lazy_args:
+        del kwargs[k]
+
+    from .rmemory import SCOPES
+    if SCOPES.get():
+        # not cached, such that the scope can be released
+        return lazy_closure(func, lazy_args)
+    key: Tuple = (func_name, func.rid, tuple(lazy_args),
+                  tuple(v.expr for v in lazy_args.values()))
+    closure: Callable | Any = LAZY_CACHE.get(key)
+    if closure is None:
+        closure = lazy_closure(func, lazy_args)
+        LAZY_CACHE.put(key, closure)
+    return closure
+
+
+def has_lazy_args(args: Dict[str, Any] | List[Any]) -> bool:
+    for v in (args.values() if isinstance(args, dict) else args):
+        if isinstance(v, lazily):
+            return True
+    return False
 
 
+def lazy_closure(func: Callable, lazy_args: Dict[str, lazily]) -> Callable | Any:
+    import rpy2.rinterface as ri
+    from .rmemory import current_env
+    from .rutils import rcall_cached
+    rargs = ri.ListSexpVector([v.rexpr for v in lazy_args.values()])
+    rargs.names = ri.StrSexpVector(list(lazy_args))
+    return rcall_cached(LAZY_CLOSURE)(func, rargs, current_env())
@@ -1,9 +1,15 @@
-from .renv import Renv
+from __future__ import annotations
 
+from typing import TYPE_CHECKING
 
-def library(env_name: str) -> Renv:
-    return Renv(env_name)
+if TYPE_CHECKING:
+    from .renv import Renv
 
 
-def importr(env_name: str) -> Renv:
-    return library(env_name)
+def library(env_name: str, robject: bool = False) -> Renv:
+    from .renv import Renv
+    return Renv(env_name, robject=robject)
+
+
+def importr(env_name: str, robject: bool = False) -> Renv:
+    return library(env_name, robject=robject)
@@ -20,18 +20,23 @@ def try_load_namespace(namespace: str, verbose: bool = False,
         capture = ROutputCapture()
         capture.capture_r_output()
     try:
-        warnings.filterwarnings('ignore')  
-        module: rpkg.Package = rpkg.importr(namespace)
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore')  
+            module: rpkg.Package = rpkg.importr(namespace)
     except rpkg.PackageNotInstalledError: 
-        choice = input(namespace + " not installed, do you want to install it? (y/n)\n")
-        if choice[0] != "y": 
-            raise rpkg.PackageNotInstalledError
-        pinfo("Installing package...", verbose=verbose)
-        ro.r(f"install.packages(\"{namespace}\")", print_r_warnings=False,
-             invisible=True)
-        pinfo("Package installed!", verbose=verbose)
+        install_namespace(namespace, verbose=verbose)
         module: rpkg.Package = rpkg.importr(namespace)
   
     if hide_r_ouptut:
         capture.reset_r_output()
     return module
+
+
+def install_namespace(namespace: str, verbose: bool = False) -> None:
+    choice = input(namespace + " not installed, do you want to install it? (y/n)\n")
+    if choice[0] != "y": 
+        raise rpkg.PackageNotInstalledError
+    pinfo("Installing package...", verbose=verbose)
+    ro.r(f"install.packages(\"{namespace}\")", print_r_warnings=False,
+         invisible=True)
+    pinfo("Package installed!", verbose=verbose)
@@ -0,0 +1,211 @@
+# On-disk cache of the assets (functions, datasets and other objects) of R
+# packages, and of the signatures of the functions. The cache is keyed by
+# the package name, the installed version of the package, the running version
+# of R, and the version of R it was built with. After the first time a
+# package is loaded, Renv can be created without querying R, or scanning the
+# package
+import os
+import re
+import json
+import shutil
+import hashlib
+import keyword
+
+from functools import cache
+from inspect import Parameter, Signature
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .options import get_option
+
+
+type Manifest = Dict[str, Any]
+
+
+def cache_dir() -> Path:
+    path: str | None = os.environ.get("WRAPR_CACHE_DIR")
+    if not path:
+        path = os.path.join(os.environ.get("XDG_CACHE_HOME", "~/.cache"),
+                            "wrapr")
+    return Path(path).expanduser()
+
+
+def read_json(path: Path) -> Any:
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def write_json(path: Path, x: Any) -> None:
+    # the cache is an optimization, so failing to write it is not an error
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp: Path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(x, f)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+
+def read_description(path: str | Path) -> Dict[str, str]:
+    # DESCRIPTION files use the debian control file format
+    fields: Dict[str, str] = {}
+    key: str | None = None
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        for line in f:
+            if line[:1].isspace() and key is not None:
+                fields[key] += " " + line.strip()
+            elif ":" in line:
+                key, value = line.split(":", 1)
+                fields[key] = value.strip()
+    return fields
+
+
+# environment variables deciding which R installation, and which libraries,
+# packages are found in
+LIBRARY_VARS: Tuple[str, ...] = ("R_HOME", "R_LIBS", "R_LIBS_USER", "R_LIBS_SITE",
+                                 "R_PROFILE_USER", "RENV_PROJECT")
+
+
+@cache
+def library_key() -> str:
+    # identifies the R installation and library paths (i.e., `.libPaths()`),
+    # without starting R. renv projects are activated from the working
+    # directory, so it is part of the key when it has an renv.lock file
+    rhome: str | None = os.environ.get("R_HOME") or shutil.which("R")
+    config: Dict[str, Any] = {k: os.environ.get(k) for k in LIBRARY_VARS}
+    config["R_HOME"] = os.path.realpath(rhome) if rhome else None
+    if os.path.isfile("renv.lock"):
+        config["renv"] = os.path.realpath(".")
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def find_description(pkg: str) -> str | None:
+    # the location of the DESCRIPTION file is cached (per R installation and
+    # library paths, see `library_key()`), such that the package can be
+    # found without starting R
+    index_path: Path = cache_dir() / "index" / f"{library_key()}.json"
+    index: Dict[str, str] = read_json(index_path) or {}
+    path: str | None = index.get(pkg)
+    if path is not None and os.path.isfile(path):
+        return path
+
+    from .rutils import rcall_cached
+    path = str(rcall_cached("function(pkg) system.file(\"DESCRIPTION\", package = pkg)")(pkg)[0])
+    if not path:
+        return None
+    index[pkg] = path
+    write_json(index_path, index)
+    return path
+
+
+def package_key(pkg: str, description: Dict[str, str]) -> str:
+    # the version of the package, of the running R, and of the R the package
+    # was built with. `Built` looks like "R 4.3.1; ; 2023-06-16 10:24:22 UTC; unix"
+    built: str = description.get("Built", "").split(";")[0].strip()
+    name: str = f"{pkg}-{description.get('Version', '')}-R_{rversion()}-{built}"
+    return re.sub(r"[^\w.-]", "_", name)
+
+
+@cache
+def rversion() -> str:
+    # the version of the base package is that of R
+    path: str | None = find_description("base")
+    return read_description(path).get("Version", "") if path else ""
+
+
+def manifest_path(pkg: str, description: Dict[str, str]) -> Path:
+    return cache_dir() / "manifests" / (package_key(pkg, description) + ".json")
+
+
+def get_manifest(pkg: str) -> Manifest:
+    description_path: str | None = find_description(pkg)
+    if description_path is None:
+        from .load_namespace import install_namespace
+        install_namespace(pkg, verbose=True)
+        description_path = find_description(pkg)
+    if description_path is None:
+        raise ValueError(f"Could not find the R package {pkg}")
+
+    use_cache: bool = get_option("manifest_cache")
+    path: Path = manifest_path(pkg, read_description(description_path))
+    manifest: Manifest | None = read_json(path) if use_cache else None
+    if manifest is None:
+        manifest = build_manifest(pkg)
+        if use_cache:
+            write_json(path, manifest)
+    return manifest
+
+
+BUILD_MANIFEST: str = """
+function(pkg) {
+    exports <- sort(getNamespaceExports(asNamespace(pkg)))
+    exports <- exports[!startsWith(exports, ".")]
+    is_function <- vapply(exports, function(x) is.function(getExportedValue(pkg, x)),
+                          logical(1), USE.NAMES = FALSE)
+    signatures <- lapply(exports[is_function], function(x) {
+        f <- getExportedValue(pkg, x)
+        as.character(names(formals(if (is.primitive(f)) args(f) else f)))
+    })
+    datasets <- suppressWarnings(utils::data(package = pkg))$results[, "Item"]
+    list(functions = exports[is_function],
+         objects = exports[!is_function],
+         datasets = sub(" .*", "", datasets),
+         signatures = signatures)
+}
+"""
+
+
+def build_manifest(pkg: str) -> Manifest:
+    from .rutils import rcall_cached
+    from .utils import pinfo
+    pinfo(f"Indexing {pkg}...", verbose=True)
+    assets = rcall_cached(BUILD_MANIFEST)(pkg)
+    rnames: Dict[str, List[str]] = {
+        k: [str(x) for x in assets.rx2(k)]
+        for k in ("functions", "objects", "datasets")
+    }
+    functions: Dict[str, str] = mangle_names(rnames["functions"])
+    signatures: Dict[str, List[str]] = {
+        r: [str(x) for x in s]
+        for r, s in zip(rnames["functions"], assets.rx2("signatures"))
+    }
+    return {
+        "package": pkg,
+        "functions": functions,
+        "datasets": mangle_names(rnames["datasets"] + rnames["objects"]),
+        "signatures": {py: signatures[r] for py, r in functions.items()}
+    }
+
+
+def mangle_names(rnames: List[str]) -> Dict[str, str]:
+    # R names are made valid python names by replacing dots with
+    # underscores. Names which are valid as-is take precedence, e.g.,
+    # `as_tibble` over `as.tibble`
+    out: Dict[str, str] = {}
+    for r in sorted(rnames, key=lambda x: "." in x):
+        py: str = r.replace(".", "_")
+        if py not in out:
+            out[py] = r
+    return out
+
+
+def rsignature(formals: List[str]) -> Signature:
+    # python signature for the formals of an R function, skipping those which
+    # aren't valid python identifiers. Arguments after `...` are keyword-only
+    params: Dict[str, Parameter] = {}
+    kind = Parameter.POSITIONAL_OR_KEYWORD
+    for x in formals:
+        if x == "...":
+            kind = Parameter.KEYWORD_ONLY
+            continue
+        name: str = x.replace(".", "_")
+        if name.isidentifier() and not keyword.iskeyword(name):
+            params.setdefault(name, Parameter(name, kind))
+    if "..." in formals:
+        params.setdefault("args", Parameter("args", Parameter.VAR_POSITIONAL))
+        params.setdefault("kwargs", Parameter("kwargs", Parameter.VAR_KEYWORD))
+    return Signature(sorted(params.values(), key=lambda p: p.kind))
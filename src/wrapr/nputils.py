@@ -1,6 +1,6 @@
 import numpy as np
 from numpy.typing import NDArray
-from rpy2.rlike.container import Any
+from typing import Any
 
 
 def np_contains(x: NDArray, pattern = Any):
@@ -12,3 +12,23 @@ def np_collapse(x: NDArray[str], sep = "_") -> str:
         x = x[np.newaxis]
     return sep.join(x)
 
+
+class LabelledArray(np.ndarray):
+    # numpy array carrying the dimnames of an R matrix/array. The labels are
+    # not propagated to new arrays (e.g., slices), as they would likely be
+    # wrong
+    def __new__(cls, x: NDArray, dimnames: tuple | None = None):
+        y = np.asarray(x).view(cls)
+        y.dimnames = dimnames
+        return y
+
+    def __array_finalize__(self, obj) -> None:
+        self.dimnames = None
+
+    def to_frame(self) -> Any:
+        import pandas as pd
+        if self.ndim != 2:
+            raise ValueError("Only 2-dimensional arrays can be converted to a DataFrame")
+        rows, cols = self.dimnames if self.dimnames is not None else (None, None)
+        return pd.DataFrame(self.view(np.ndarray), index=rows, columns=cols,
+                            copy=False)
@@ -0,0 +1,70 @@
+# Global options, changing how wrapr converts objects between R and python
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator
+
+
+OPTIONS: Dict[str, Any] = {
+    # return numeric, integer and logical R vectors as (read-only) numpy
+    # views on R's memory, instead of copying them. Logical vectors are
+    # returned as int32 arrays, as that is how R stores them
+    "zero_copy": False,
+    # cache the functions and datasets of R packages on disk (see
+    # `manifest.cache_dir()`), such that they don't have to be scanned every
+    # time a package is loaded
+    "manifest_cache": True,
+    # cache the datasets of R packages on disk once they are converted, as
+    # Feather files (DataFrames, requires pyarrow) or .npy files (numpy
+    # arrays), which are memory-mapped when they are loaded (see
+    # `data_cache`)
+    "data_cache": True,
+    # record the time spent converting arguments and results, and calling R,
+    # for every wrapped R function (see `profiling.stats()`)
+    "profile": False,
+    # reuse the R objects converted from numpy arrays and DataFrames which
+    # are passed to R repeatedly. Either "frozen" (only objects marked with
+    # `freeze()`), "fingerprint" (any large object, see `convert_cache`) or
+    # None. The cache is bounded by `conversion_cache_bytes`
+    "conversion_cache": "frozen",
+    "conversion_cache_bytes": 1 << 30,
+    # transfer data frames through the Arrow C stream interface (requires
+    # pyarrow, and the nanoarrow R package). Either "auto" (for data frames
+    # of at least `arrow_threshold` bytes), True (always) or False
+    "arrow": "auto",
+    "arrow_threshold": 1 << 24,
+    # how character vectors are returned from R. Either "U" (fixed-width
+    # numpy unicode arrays), "object" (numpy object arrays, sharing the
+    # python string of repeated values), "string" (pandas StringDtype) or
+    # "category" (pandas Categorical)
+    "string_mode": "U",
+    # return R lists as `RList`s, converting their elements on access,
+    # instead of converting them to dicts and lists up front
+    "lazy_lists": True,
+    # collect garbage (python's, then R's) every `gc_calls` calls of wrapped
+    # R functions, or when R's heap exceeds `gc_heap_bytes` (checked every
+    # 100 calls). Both are disabled when None, see `rmemory`
+    "gc_calls": None,
+    "gc_heap_bytes": None,
+}
+
+
+def get_option(name: str) -> Any:
+    if name not in OPTIONS:
+        raise KeyError(f"Unknown option: {name}")
+    return OPTIONS[name]
+
+
+def set_option(name: str, value: Any) -> None:
+    if name not in OPTIONS:
+        raise KeyError(f"Unknown option: {name}")
+    OPTIONS[name] = value
+
+
+@contextmanager
+def option_context(**kwargs: Any) -> Iterator[None]:
+    old: Dict[str, Any] = {k: get_option(k) for k in kwargs}
+    try:
+        for k, v in kwargs.items():
+            set_option(k, v)
+        yield
+    finally:
+        OPTIONS.update(old)
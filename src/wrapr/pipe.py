@@ -0,0 +1,119 @@
+# Deferred pipelines of R calls. The calls are recorded, and evaluated in R as
+# a single (nested) call when the pipeline is collected, such that the input
+# is converted to R once, and only the final result is converted back, e.g.,
+#
+#   dplyr = wr.library("dplyr")
+#   (wr.pipe(df, dplyr)
+#       .mutate(y=wr.lazily("x * 2"))
+#       .filter(wr.lazily("y > 1"))
+#       .collect())
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
+
+from .lazy_rexpr import lazily
+
+if TYPE_CHECKING:
+    from .renv import Renv
+
+
+# (function name, positional arguments, keyword arguments)
+type PipeStep = Tuple[str, Tuple[Any, ...], Dict[str, Any]]
+
+
+# the input is bound to `.x` in the environment the chain is evaluated in,
+# such that lazy arguments can refer to it, as well as to `env` (the global
+# environment, or that of the current `rmemory.scope()`)
+PIPE_EVAL: str = """
+function(x, steps, env) {
+    call <- quote(.x)
+    for (s in steps)
+        call <- as.call(c(list(s[[1]], call), s[[2]]))
+    eval(call, list(.x = x), env)
+}
+"""
+
+
+class Pipe():
+    def __init__(self, x: Any, envs: Tuple[Renv, ...],
+                 steps: Tuple[PipeStep, ...] = ()) -> None:
+        self.x = x
+        self.envs = envs
+        self.steps = steps
+
+    def __repr__(self) -> str:
+        return " |> ".join(["pipe"] + [name for name, _, _ in self.steps])
+
+    def __getattr__(self, name: str) -> Callable:
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        def step(*args, **kwargs) -> Pipe:
+            return self.then(name, *args, **kwargs)
+        return step
+
+    def then(self, name: str, *args, **kwargs) -> Pipe:
+        # adds a call to the function `name`, with the result of the previous
+        # step as its first argument. Unlike functions called directly, lazy
+        # arguments may be positional here
+        return Pipe(self.x, self.envs, self.steps + ((name, args, kwargs),))
+
+    def collect(self, robject: bool = False) -> Any:
+        # evaluates the pipeline in R, and converts the result (unless
+        # `robject` is True, then an `Robject` handle is returned)
+        from .rthread import on_rthread, run_on_rthread
+        if not on_rthread():
+            return run_on_rthread(self.collect, robject)
+        from .rutils import rcall_cached
+        from .convert_r2py import convert_r2py
+        from .rmemory import current_env
+        from .robject import Robject
+        import rpy2.rinterface as ri
+
+        steps: List[Any] = []
+        for name, args, kwargs in self.steps:
+            func: Any = self.rfunction(name)
+            translate: Dict[str, str] = getattr(func, "_prm_translate", {})
+            rargs = ri.ListSexpVector(
+                [pipe_arg(v) for v in args] + [pipe_arg(v) for v in kwargs.values()]
+            )
+            if kwargs:
+                rargs.names = ri.StrSexpVector(
+                    [""] * len(args) + [translate.get(k, k) for k in kwargs]
+                )
+            steps.append(ri.ListSexpVector([func, rargs]))
+
+        out: Any = rcall_cached(PIPE_EVAL)(pipe_arg(self.x),
+                                           ri.ListSexpVector(steps),
+                                           current_env())
+        return Robject(out) if robject else convert_r2py(out)
+
+    def rfunction(self, name: str) -> Any:
+        # functions are looked up in the environments of the pipe, in order,
+        # and otherwise in R's global environment
+        from .renv import get_rfunction
+        from .rutils import rcall_cached
+        for env in self.envs:
+            if name in env.__Rfuncs__:
+                env.__attach_namespace__()
+                return get_rfunction(env.__Rfuncs__[name], env.__env_name__)
+        return rcall_cached(name)
+
+
+def pipe_arg(x: Any) -> Any:
+    # R object for an argument of a step. Lazy expressions are inserted into
+    # the call unevaluated
+    import rpy2.robjects as ro
+    import rpy2.rinterface as ri
+    from .convert_py2r import convert_pyobject2r
+    if isinstance(x, lazily):
+        return x.rexpr
+    out: Any = convert_pyobject2r(x)
+    if not isinstance(out, ri.Sexp):
+        out = ro.conversion.get_conversion().py2rpy(out)
+    return out
+
+
+def pipe(x: Any, *envs: Renv) -> Pipe:
+    # starts a pipeline on `x`, with functions looked up in `envs` (see
+    # `library()`)
+    return Pipe(x, envs)
@@ -0,0 +1,272 @@
+# Pool of worker processes, each with its own embedded R session, for running
+# independent R calls in parallel, e.g.,
+#
+#   with wr.Pool(4, libraries=["GaussSuppression"]) as pool:
+#       gs = pool.library("GaussSuppression")
+#       futures = [gs.GaussSuppressDec(df, ...) for df in regions]
+#       results = [f.result() for f in futures]
+#
+# Large numpy arrays (and the columns of DataFrames) are moved between the
+# processes through shared memory, instead of being pickled
+from __future__ import annotations
+
+import multiprocessing
+import numpy as np
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Tuple
+
+from .utils import is_pandas
+from .rlist import RList
+
+if TYPE_CHECKING:
+    from .renv import Renv
+
+
+# arrays smaller than this are pickled
+SHM_MIN_BYTES: int = 1 << 20
+
+
+class SharedArray:
+    # numpy array in a shared memory block, pickled as its name and layout
+    def __init__(self, name: str, shape: Tuple[int, ...], dtype: str,
+                 order: str) -> None:
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+        self.order = order
+
+
+class SharedFrame:
+    # DataFrame with its numpy-backed columns in shared memory. Columns are
+    # stored as (name, kind, payload)
+    def __init__(self, columns: List[Tuple[Any, str, Any]], index: Any,
+                 nrow: int) -> None:
+        self.columns = columns
+        self.index = index
+        self.nrow = nrow
+
+
+def share(x: Any, blocks: List[SharedMemory]) -> Any:
+    # replaces large arrays in `x` by SharedArrays, the shared memory blocks
+    # are appended to `blocks`
+    match x:
+        case np.ndarray() if x.nbytes >= SHM_MIN_BYTES and x.dtype.kind in "biuf":
+            order: str = "F" if x.flags.f_contiguous and not x.flags.c_contiguous else "C"
+            shm: SharedMemory = SharedMemory(create=True, size=x.nbytes)
+            blocks.append(shm)
+            np.copyto(np.ndarray(x.shape, x.dtype, buffer=shm.buf, order=order), x)
+            return SharedArray(shm.name, x.shape, x.dtype.str, order)
+        case _ if is_pandas(x, "DataFrame"):
+            return share_frame(x, blocks)
+        case list() | tuple():
+            return rebuild(x, (share(v, blocks) for v in x))
+        case dict():
+            return {k: share(v, blocks) for k, v in x.items()}
+        case _:
+            return x
+
+
+def rebuild(x: List | Tuple, values: Iterable[Any]) -> List | Tuple:
+    # namedtuples take their fields as separate arguments
+    if hasattr(x, "_fields"):
+        return type(x)(*values)
+    return type(x)(values)
+
+
+def share_frame(x: Any, blocks: List[SharedMemory]) -> SharedFrame:
+    import pandas as pd
+    columns: List[Tuple[Any, str, Any]] = []
+    for name, col in x.items():
+        if isinstance(col.dtype, pd.CategoricalDtype):
+            columns.append((name, "categorical",
+                            (share(col.cat.codes.to_numpy(), blocks),
+                             col.cat.categories, col.cat.ordered)))
+        elif isinstance(col.dtype, np.dtype) and col.dtype.kind in "biuf":
+            columns.append((name, "array", share(col.to_numpy(copy=False), blocks)))
+        else:
+            columns.append((name, "series", col.reset_index(drop=True)))
+    index: Any = None if x.index.equals(pd.RangeIndex(len(x))) else x.index
+    return SharedFrame(columns, index, len(x))
+
+
+def unshare(x: Any, blocks: List[SharedMemory], copy: bool) -> Any:
+    # inverse of `share()`. If `copy` is False the arrays are views on the
+    # shared memory, which must be released (see `release()`) once they are
+    # no longer used
+    match x:
+        case SharedArray():
+            shm: SharedMemory = SharedMemory(name=x.name)
+            blocks.append(shm)
+            out = np.ndarray(x.shape, np.dtype(x.dtype), buffer=shm.buf,
+                             order=x.order)
+            return out.copy(order="K") if copy else out
+        case SharedFrame():
+            return unshare_frame(x, blocks, copy)
+        case list() | tuple():
+            return rebuild(x, (unshare(v, blocks, copy) for v in x))
+        case dict():
+            return {k: unshare(v, blocks, copy) for k, v in x.items()}
+        case _:
+            return x
+
+
+def unshare_frame(x: SharedFrame, blocks: List[SharedMemory], copy: bool) -> Any:
+    import pandas as pd
+    columns: List[Any] = []
+    for _, kind, payload in x.columns:
+        match kind:
+            case "categorical":
+                codes, categories, ordered = payload
+                columns.append(pd.Categorical.from_codes(
+                    unshare(codes, blocks, copy), categories=categories,
+                    ordered=ordered, validate=False
+                ))
+            case "array":
+                columns.append(unshare(payload, blocks, copy))
+            case _:
+                columns.append(payload)
+    # the index is given, such that frames without columns keep their rows
+    df = pd.DataFrame(dict(enumerate(columns)), index=pd.RangeIndex(x.nrow),
+                      copy=False)
+    df.columns = [name for name, _, _ in x.columns]
+    if x.index is not None:
+        df.index = x.index
+    return df
+
+
+def release(blocks: List[SharedMemory], unlink: bool = False) -> None:
+    for shm in blocks:
+        try:
+            shm.close()
+        except BufferError:
+            # still referenced by a view, the block is closed once the view
+            # is garbage collected
+            pass
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+    blocks.clear()
+
+
+# Renvs of the worker process
+WORKER_ENVS: Dict[str, Renv] = {}
+
+
+def worker_env(env_name: str) -> Renv:
+    from .library import library
+    env: Renv | None = WORKER_ENVS.get(env_name)
+    if env is None:
+        env = WORKER_ENVS[env_name] = library(env_name)
+    return env
+
+
+def init_worker(libraries: Tuple[str, ...]) -> None:
+    # loads the libraries, and attaches their namespaces, when the worker
+    # starts, rather than on its first call
+    for name in libraries:
+        worker_env(name).__attach_namespace__()
+
+
+def run_in_worker(env_name: str, func_name: str, args: Tuple[Any, ...],
+                  kwargs: Dict[str, Any]) -> Any:
+    blocks: List[SharedMemory] = []
+    try:
+        args = unshare(args, blocks, copy=False)
+        kwargs = unshare(kwargs, blocks, copy=False)
+        out: Any = getattr(worker_env(env_name), func_name)(*args, **kwargs)
+    finally:
+        del args, kwargs
+        release(blocks)
+    if isinstance(out, RList):
+        out = out.to_py()
+    # the blocks of the result are unlinked by the parent, once it has read them
+    out = share(out, blocks)
+    release(blocks)
+    return out
+
+
+class Pool:
+    def __init__(self, n: int | None = None, libraries: Iterable[str] = ()) -> None:
+        # `n` worker processes (by default the number of CPUs), with the
+        # namespaces of `libraries` loaded on start. Workers are spawned, such
+        # that they don't inherit the R session of this process
+        self.executor = ProcessPoolExecutor(
+            max_workers=n, mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker, initargs=(tuple(libraries),)
+        )
+
+    def __enter__(self) -> Pool:
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
+
+    def shutdown(self, wait: bool = True) -> None:
+        self.executor.shutdown(wait=wait)
+
+    def submit(self, env_name: str, func_name: str, *args, **kwargs) -> Future:
+        # calls `library(env_name).func_name(*args, **kwargs)` in a worker
+        blocks: List[SharedMemory] = []
+        try:
+            raw: Future = self.executor.submit(run_in_worker, env_name, func_name,
+                                               share(args, blocks),
+                                               share(kwargs, blocks))
+        except BaseException:
+            # e.g., the pool is shut down, the blocks would otherwise leak
+            release(blocks, unlink=True)
+            raise
+        future: Future = Future()
+
+        def done(raw: Future) -> None:
+            release(blocks, unlink=True)
+            if raw.cancelled():
+                future.cancel()
+            elif raw.exception() is not None:
+                future.set_exception(raw.exception())
+            else:
+                result_blocks: List[SharedMemory] = []
+                try:
+                    future.set_result(unshare(raw.result(), result_blocks, copy=True))
+                except Exception as e:
+                    future.set_exception(e)
+                finally:
+                    release(result_blocks, unlink=True)
+
+        future.set_running_or_notify_cancel()
+        raw.add_done_callback(done)
+        return future
+
+    def library(self, env_name: str) -> PoolEnv:
+        return PoolEnv(self, env_name)
+
+    def map(self, func: PoolFunction, *iterables: Iterable) -> Iterator[Any]:
+        # like `map(func, *iterables)`, with the calls run in parallel. The
+        # results are yielded in order
+        futures: List[Future] = [func(*args) for args in zip(*iterables)]
+        return (future.result() for future in futures)
+
+
+class PoolEnv:
+    # mirrors an Renv, where functions return futures
+    def __init__(self, pool: Pool, env_name: str) -> None:
+        self.pool = pool
+        self.env_name = env_name
+
+    def __getattr__(self, name: str) -> PoolFunction:
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        return PoolFunction(self.pool, self.env_name, name)
+
+
+class PoolFunction:
+    def __init__(self, pool: Pool, env_name: str, name: str) -> None:
+        self.pool = pool
+        self.env_name = env_name
+        self.name = name
+
+    def __call__(self, *args, **kwargs) -> Future:
+        return self.pool.submit(self.env_name, self.name, *args, **kwargs)
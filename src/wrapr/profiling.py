@@ -0,0 +1,160 @@
+# Opt-in instrumentation of calls to wrapped R functions. For every call the
+# wall time of each stage (py -> R conversion, the R call itself, and R -> py
+# conversion) is recorded, along with the (approximate) number of bytes
+# converted in each direction. Profiling is enabled with
+# `set_option("profile", True)`, or within a `profile()` block. When it is
+# disabled, the cost is a single check per call
+import time
+
+from functools import cache
+from contextlib import contextmanager
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, Iterator, List
+
+from .options import OPTIONS
+
+
+@dataclass
+class CallStats:
+    calls: int = 0
+    py2r: float = 0.0 # seconds
+    rcall: float = 0.0
+    r2py: float = 0.0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    rheap: float = 0.0 # growth of R's heap, in Mb (only with memory=True)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.calls += 1
+        for k in ("py2r", "rcall", "r2py", "bytes_in", "bytes_out", "rheap"):
+            setattr(self, k, getattr(self, k) + (record[k] or 0))
+
+
+class Profile:
+    # statistics for the calls made within a `profile()` block
+    def __init__(self, memory: bool = False,
+                 callback: Callable[[Dict[str, Any]], Any] | None = None) -> None:
+        self.memory: bool = memory
+        self.callback = callback
+        self.functions: Dict[str, CallStats] = {}
+
+    def record(self, record: Dict[str, Any]) -> None:
+        self.functions.setdefault(record["function"], CallStats()).add(record)
+        if self.callback is not None:
+            self.callback(record)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {k: asdict(v) for k, v in self.functions.items()}
+
+
+# statistics collected while profiling is enabled, and the active profiles
+# of `profile()` blocks
+STATS: Profile = Profile()
+PROFILES: List[Profile] = []
+CALLBACKS: List[Callable[[Dict[str, Any]], Any]] = []
+
+
+def profiling_active() -> bool:
+    return OPTIONS["profile"] or bool(PROFILES)
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    # per-function statistics, for all calls made while profiling was enabled
+    return STATS.stats()
+
+
+def reset_stats() -> None:
+    STATS.functions.clear()
+
+
+def add_profile_callback(callback: Callable[[Dict[str, Any]], Any]) -> None:
+    # `callback` is called with the record of every profiled call, e.g.,
+    # for forwarding the numbers to a metrics system
+    CALLBACKS.append(callback)
+
+
+def remove_profile_callback(callback: Callable[[Dict[str, Any]], Any]) -> None:
+    CALLBACKS.remove(callback)
+
+
+@contextmanager
+def profile(memory: bool = False,
+            callback: Callable[[Dict[str, Any]], Any] | None = None) -> Iterator[Profile]:
+    # profile the calls made within the block. With `memory=True` the growth
+    # of R's heap is recorded as well, which triggers a (minor) garbage
+    # collection in R before and after every call
+    p: Profile = Profile(memory=memory, callback=callback)
+    PROFILES.append(p)
+    try:
+        yield p
+    finally:
+        PROFILES.remove(p)
+
+
+class CallTimer:
+    # timings for a single call, see `function_wrapper.wrap_rfunc()`
+    def __init__(self, name: str | None) -> None:
+        self.memory: bool = any(p.memory for p in PROFILES)
+        self.record: Dict[str, Any] = {
+            "function": name or "<anonymous>",
+            "py2r": None, "rcall": None, "r2py": None,
+            "bytes_in": 0, "bytes_out": 0, "rheap": None
+        }
+        self.t: float = time.perf_counter()
+
+    def lap(self, stage: str) -> None:
+        t: float = time.perf_counter()
+        self.record[stage] = t - self.t
+        self.t = t
+
+    def converted(self, args: List[Any], kwargs: Dict[str, Any]) -> None:
+        self.lap("py2r")
+        self.record["bytes_in"] = sum(map(rbytes, args)) + \
+            sum(map(rbytes, kwargs.values()))
+        if self.memory:
+            self.heap: float = rheap()
+        self.t = time.perf_counter()
+
+    def called(self, r_object: Any) -> None:
+        self.lap("rcall")
+        if self.memory:
+            self.record["rheap"] = rheap() - self.heap
+        self.record["bytes_out"] = rbytes(r_object)
+        self.t = time.perf_counter()
+
+    def finish(self) -> None:
+        self.lap("r2py")
+        STATS.record(self.record)
+        for p in PROFILES:
+            p.record(self.record)
+        for callback in CALLBACKS:
+            callback(self.record)
+
+
+def rbytes(x: Any) -> int:
+    # approximate size of the data in an R object. Strings are counted as
+    # pointers, and attributes
+    # (except the slots of S4 objects) are ignored
+    import rpy2.rinterface as ri
+    match x:
+        case ri.SexpS4():
+            return sum(rbytes(x.do_slot(str(k))) for k in x.list_attrs())
+        case ri.ListSexpVector():
+            return sum(map(rbytes, x))
+        case ri.SexpVector() if x.typeof in rtype_bytes():
+            return len(x) * rtype_bytes()[x.typeof]
+        case _:
+            return 0
+
+
+def rheap() -> float:
+    # Mb used by R (Ncells and Vcells)
+    from .rutils import rcall_cached
+    return float(rcall_cached("function() sum(gc(full = FALSE)[, 2])")()[0])
+
+
+@cache
+def rtype_bytes() -> Dict[Any, int]:
+    import rpy2.rinterface as ri
+    return {ri.RTYPES.REALSXP: 8, ri.RTYPES.INTSXP: 4, ri.RTYPES.LGLSXP: 4,
+            ri.RTYPES.CPLXSXP: 16, ri.RTYPES.RAWSXP: 1, ri.RTYPES.STRSXP: 8}
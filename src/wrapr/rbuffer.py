@@ -0,0 +1,136 @@
+# Low level helpers for moving data between numpy buffers and the memory of
+# R's atomic vectors, without going through rpy2's element-by-element
+# sequence protocol
+import numpy as np
+import rpy2.robjects as ro
+import rpy2.rinterface as ri
+
+from numpy.typing import NDArray
+from typing import Any, Callable, Dict, Tuple
+from rpy2.rinterface_lib import openrlib, memorymanagement, conversion
+
+
+# R's NA_integer_ (and NA for logicals) is INT_MIN
+NA_INTEGER: int = -2**31
+
+# R's NA_real_ is a NaN with the payload 1954
+NA_REAL: float = np.array([0x7FF00000000007A2], dtype=np.int64).view(np.float64)[0]
+
+# numpy dtype of the memory backing the R vector, and the accessor for its
+# data pointer. Note that logicals are stored as 32bit integers in R
+RBUFFER_TYPES: Dict[ri.RTYPES, Tuple[np.dtype, Callable]] = {
+    ri.RTYPES.REALSXP: (np.dtype("float64"), openrlib.REAL),
+    ri.RTYPES.INTSXP: (np.dtype("int32"), openrlib.INTEGER),
+    ri.RTYPES.LGLSXP: (np.dtype("int32"), openrlib.LOGICAL),
+}
+
+
+@conversion._cdata_res_to_rinterface
+def _alloc_rvector(rtype: int, n: int) -> Any:
+    with memorymanagement.rmemory() as rmemory:
+        return rmemory.protect(openrlib.rlib.Rf_allocVector(rtype, n))
+
+
+def alloc_rvector(rtype: ri.RTYPES, n: int) -> ri.SexpVector:
+    # allocates an (uninitialized) R vector, the content must be filled
+    # before it is handed to R
+    return _alloc_rvector(rtype.value, n)
+
+
+def rvector_buffer(x: ri.SexpVector) -> NDArray:
+    # flat, writable view on the memory of an atomic R vector. The view does
+    # NOT keep the R object alive, see `rvector_view()` for that
+    dtype, get_ptr = RBUFFER_TYPES[x.typeof]
+    n: int = len(x)
+    if not n:
+        return np.empty(0, dtype=dtype)
+    ptr = get_ptr(x.__sexp__._cdata)
+    return np.frombuffer(openrlib.ffi.buffer(ptr, n * dtype.itemsize),
+                         dtype=dtype)
+
+
+def numpy_rtype(x: NDArray) -> ri.RTYPES | None:
+    match x.dtype.kind:
+        case "b":
+            return ri.RTYPES.LGLSXP
+        case "i" | "u" if fits_rinteger(x):
+            return ri.RTYPES.INTSXP
+        case "i" | "u" | "f":
+            return ri.RTYPES.REALSXP
+        case _:
+            return None
+
+
+def fits_rinteger(x: NDArray) -> bool:
+    # R integers are 32bit, and INT_MIN is reserved for NA
+    if np.can_cast(x.dtype, np.int32):
+        return True
+    if not x.size:
+        return True
+    info = np.iinfo(np.int32)
+    return x.min() > info.min and x.max() <= info.max
+
+
+def numpy2rvector(x: NDArray, rtype: ri.RTYPES | None = None) -> ri.SexpVector:
+    # allocate the R vector once, and fill it with a single (strided) copy
+    # from the numpy buffer. R is column-major, so the destination is viewed
+    # in Fortran order, which makes numpy handle C-ordered and non-contiguous
+    # input, as well as bool -> logical widening
+    rtype = numpy_rtype(x) if rtype is None else rtype
+    if rtype is None:
+        raise TypeError(f"Unsupported dtype for R vector: {x.dtype}")
+    y: ri.SexpVector = alloc_rvector(rtype, x.size)
+    if x.size:
+        dest: NDArray = rvector_buffer(y).reshape(x.shape, order="F")
+        np.copyto(dest, x, casting="unsafe")
+    if x.ndim > 1:
+        y.do_slot_assign("dim", ri.IntSexpVector(x.shape))
+    return y
+
+
+def rpy2py(x: ri.Sexp) -> Any:
+    # wrap an rinterface-level object in its robjects class (e.g.,
+    # FloatVector, FloatMatrix, FloatArray) without copying
+    return ro.default_converter.rpy2py(x)
+
+
+def rvector_dim(x: ri.SexpVector) -> Tuple[int, ...] | None:
+    try:
+        return tuple(x.do_slot("dim"))
+    except LookupError:
+        return None
+
+
+class RBuffer:
+    # Exposes the memory of an atomic R vector through numpy's
+    # `__array_interface__`. numpy arrays created from an RBuffer keep it as
+    # their base, and the RBuffer keeps the R object alive (i.e., protected
+    # from R's garbage collector) for as long as any of the arrays exist
+    def __init__(self, x: ri.SexpVector) -> None:
+        if x.typeof not in RBUFFER_TYPES:
+            raise TypeError(f"Cannot view R vector of type {x.typeof}")
+        self.robj = x
+
+    @property
+    def __array_interface__(self) -> Dict[str, Any]:
+        dtype, get_ptr = RBUFFER_TYPES[self.robj.typeof]
+        shape: Tuple[int, ...] = rvector_dim(self.robj) or (len(self.robj),)
+        # R arrays are column-major
+        strides: Tuple[int, ...] = tuple(
+            int(np.prod(shape[:i])) * dtype.itemsize for i in range(len(shape))
+        )
+        ptr = get_ptr(self.robj.__sexp__._cdata)
+        return {"shape": shape,
+                "typestr": dtype.str,
+                "strides": strides,
+                "data": (int(openrlib.ffi.cast("uintptr_t", ptr)), True),
+                "version": 3}
+
+
+def rvector_view(x: ri.SexpVector) -> NDArray:
+    # read-only (zero-copy) numpy view on an R vector, in Fortran order for
+    # matrices and arrays
+    if not len(x):
+        dtype, _ = RBUFFER_TYPES[x.typeof]
+        return np.empty(rvector_dim(x) or (0,), dtype=dtype, order="F")
+    return np.asarray(RBuffer(x))
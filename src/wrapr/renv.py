@@ -1,42 +1,42 @@
-import pandas as pd
-import numpy as np
+from __future__ import annotations
+
 import warnings
 
-import rpy2.robjects as ro
-import rpy2.robjects.vectors as vc
-import rpy2.rlike.container as rcnt
-import rpy2.robjects.packages as rpkg
+from typing import TYPE_CHECKING, Any, Callable, Dict, List
 
-from numpy.typing import NDArray
-from typing import Any, Callable, Dict, List, OrderedDict, Set, Tuple
-from copy import Error
-from rpy2.robjects import pandas2ri, numpy2ri
+from .manifest import Manifest, get_manifest, rsignature
+from .utils import ROutputCapture
+from .rthread import on_rthread, run_on_rthread
 
-from .load_namespace import load_base_envs, try_load_namespace
-from .utils import ROutputCapture, pinfo
-from .function_wrapper import rfunc, wrap_rfunc # wrap_rfunc should perhaps be its own module
-from .rutils import rcall
+if TYPE_CHECKING:
+    from .aio import AsyncRenv
+
+# NOTE: rpy2 (and thereby the embedded R session) is only imported once a
+# function or dataset is used, such that creating an Renv from a cached
+# manifest doesn't start R
 
-class Renv:
-    def __init__(self, env_name):
-        pinfo("Loading packages...", verbose=True)
-        # self.__Renvironments__ = load_base_envs()
-        self.__set_base_lib__(try_load_namespace(env_name, verbose=True))
-        
-        funcs, datasets = get_assets(env_name, module=self.__base_lib__)
-        self.__setRfuncs__(funcs) 
-        self.__setRdatasets__(datasets) 
 
-        pinfo("Done!", verbose=True)
+class Renv:
+    def __init__(self, env_name: str, robject: bool = False):
+        # only the (cached) manifest of the package is read here, the
+        # namespace is attached when the first function or dataset is used.
+        # If `robject` is True, functions return `Robject` handles instead
+        # of python objects
+        self.__env_name__: str = env_name
+        self.__robject__: bool = robject
+        self.__attached__: bool = False
+        manifest: Manifest = get_manifest(env_name)
+        self.__setRfuncs__(manifest["functions"])
+        self.__setRdatasets__(manifest["datasets"])
+        self.__signatures__: Dict[str, List[str]] = manifest["signatures"]
         return None
-  
-    def __set_base_lib__(self, rpkg: rpkg.Package) -> None:
-        self.__base_lib__ = rpkg
 
-    def __setRfuncs__(self, funcs: set[str]) -> None:
+    def __setRfuncs__(self, funcs: Dict[str, str]) -> None:
+        # python name -> R name
         self.__Rfuncs__ = funcs
     
-    def __setRdatasets__(self, datasets: set[str]) -> None:
+    def __setRdatasets__(self, datasets: Dict[str, str]) -> None:
+        # python name -> R name
         self.__Rdatasets__ = datasets
 
     def __attach__(self, name: str, attr: Any) -> None:
@@ -44,42 +44,95 @@ class Renv:
             return
         setattr(self, name, attr)
 
+    def __attach_namespace__(self) -> None:
+        # attached, such that lazy expressions can refer to the package
+        if not self.__attached__:
+            from .rutils import rcall
+            rcall(f"suppressPackageStartupMessages(library({self.__env_name__}))")
+            self.__attached__ = True
+
+    def __dir__(self) -> List[str]:
+        return sorted(set(super().__dir__()) | self.__Rfuncs__.keys() |
+                      self.__Rdatasets__.keys())
+
+    @property
+    def acall(self) -> AsyncRenv:
+        # the functions of the environment as coroutine functions, see `aio`
+        from .aio import AsyncRenv
+        return AsyncRenv(self.__env_name__, renv=self)
+
     def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        if not on_rthread():
+            return run_on_rthread(self.__getattr__, name)
         if self.__Rfuncs__ is None or self.__Rdatasets__ is None:
             raise ValueError("Renv is not correctly initialized")
+        if name in self.__Rdatasets__ and name not in self.__Rfuncs__:
+            # datasets cached on disk are read without touching R
+            from .data_cache import read_dataset
+            data: Any = read_dataset(self.__Rdatasets__[name], self.__env_name__)
+            if data is not None:
+                self.__attach__(name=name, attr=data)
+                return data
         
         capture = ROutputCapture()
         capture.capture_r_output()
 
+        from .function_wrapper import wrap_rfunc
         if name in self.__Rfuncs__:
-            fun: Callable = wrap_rfunc(getattr(self.__base_lib__, name), name=name)
+            self.__attach_namespace__()
+            rname: str = self.__Rfuncs__[name]
+            fun: Callable = wrap_rfunc(get_rfunction(rname, self.__env_name__),
+                                       name=name, robject=self.__robject__)
+            if fun is not None:
+                fun.__signature__ = rsignature(self.__signatures__.get(name, []))
             self.__attach__(name=name, attr=fun)
             capture.reset_r_output()
-            return getattr(self, name)
+            return fun
         elif name in self.__Rdatasets__:
-            self.__attach__(name=name, attr=fetch_data(name, self.__base_lib__))
+            self.__attach_namespace__()
+            data: Any = fetch_data(self.__Rdatasets__[name], self.__env_name__)
+            self.__attach__(name=name, attr=data)
             capture.reset_r_output()
-            return getattr(self, name)
+            return data
         else: 
+            capture.reset_r_output()
             warnings.warn("fetching assets from R-environment directly, this feature is not finished yet")
-            fun: Callable = rfunc(name) # in the future this should also work for datasets
+            # in the future this should also work for datasets. Wrapped per
+            # Renv, such that `robject` is respected
+            from .rutils import rcall_cached
+            fun: Callable = wrap_rfunc(rcall_cached(name), name=name,
+                                       robject=self.__robject__)
             # add error handling for corrupt function, getting stuck to Renv
             self.__attach__(name=name, attr=fun)
-            return getattr(self, name)
+            return fun
 
     def __function__(self, name: str, expr: str) -> None:
-        rfunc: Callable | Any = ro.r(expr, invisible=True,
-                                     print_r_warnings=False)
-        # also attach to global namespace
-        rcall(f"{name} <- {expr}")
-        pyfunc: Callable = wrap_rfunc(rfunc, name=name)
-
+        if not on_rthread():
+            return run_on_rthread(self.__function__, name, expr)
+        from .function_wrapper import wrap_rfunc
+        from .rmemory import attribute, track_function
+        from .rutils import rcall, invalidate_rcache
+        # also attach to the global namespace (or the current scope, see
+        # `rmemory.scope()`)
+        rfunc: Callable | Any = rcall(f"{name} <- {expr}")
+        invalidate_rcache(name)
+        pyfunc: Callable = wrap_rfunc(rfunc, name=name,
+                                      robject=self.__robject__)
+
+        previous: Any = attribute(self, name)
         self.__attach__(name=name, attr=pyfunc)
+        track_function(self, name, previous)
 
     def function(self, expr: str) -> Callable:
-        rfunc: Callable | Any = ro.r(expr, invisible=True,
-                                     print_r_warnings=False)
-        pyfunc: Callable = wrap_rfunc(rfunc, name=None)
+        if not on_rthread():
+            return run_on_rthread(self.function, expr)
+        from .function_wrapper import wrap_rfunc
+        from .rutils import rcall
+        rfunc: Callable | Any = rcall(expr)
+        pyfunc: Callable = wrap_rfunc(rfunc, name=None,
+                                      robject=self.__robject__)
         if not callable(pyfunc):
             raise ValueError("R object is not a function")
         return pyfunc
@@ -95,23 +148,33 @@ class Renv:
     #         return attributes
 
 
-def fetch_data(dataset: str, module: rpkg.Package) -> pd.DataFrame | None:
-    with (ro.default_converter + pandas2ri.converter).context():
-        try:
-            return rpkg.data(module).fetch(dataset)[dataset]
-        except KeyError:
-            return None
-        except:
-            return None
-
-        
-def get_assets(env_name: str, module: rpkg.Package) -> Tuple[Set[str], Set[str]]:
-    rcode: str = f"library({env_name}); ls(\"package:{env_name}\")"
-    # rcode: str = f"ls(\"package:{env_name}\")"
-    rattrs: Set[str] = {x.replace(".", "_") for x in 
-                        set(ro.r(rcode, invisible=True, 
-                                 print_r_warnings=False))}
-
-    pyattrs: Set[str] = set(dir(module))
-    # return: funcs, other-assets
-    return (rattrs & pyattrs, rattrs - pyattrs)
+def get_rfunction(rname: str, env_name: str) -> Callable | Any:
+    # R functions are wrapped as rpy2's SignatureTranslatedFunction, such
+    # that e.g., `check_names` is translated to `check.names`
+    from .rutils import rcall_cached
+    getExportedValue: Callable = rcall_cached("getExportedValue")
+    return getExportedValue(env_name, rname)
+
+
+FETCH_DATA: str = """
+function(name, pkg) {
+    if (name %in% getNamespaceExports(pkg)) 
+        return(getExportedValue(pkg, name))
+    env <- new.env()
+    utils::data(list = name, package = pkg, envir = env)
+    get(name, envir = env)
+}
+"""
+
+
+def fetch_data(dataset: str, env_name: str) -> Any:
+    from rpy2.rinterface_lib.embedded import RRuntimeError
+    from .convert_r2py import convert_r2py
+    from .data_cache import write_dataset
+    from .rutils import rcall_cached
+    try:
+        data: Any = convert_r2py(rcall_cached(FETCH_DATA)(dataset, env_name))
+    except RRuntimeError:
+        return None
+    write_dataset(data, dataset, env_name)
+    return data
@@ -0,0 +1,159 @@
+# Lazy view on an R list. Elements are converted to python on first access
+# (and cached), such that the parts of a returned list which are never used
+# aren't converted. Named lists behave like dicts, and unnamed lists like
+# (read-only) lists, i.e., iterating them gives their elements, and they can
+# be sliced. Passing an RList back to R doesn't convert anything
+import warnings
+
+import numpy as np
+
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .rthread import on_rthread, run_on_rthread
+
+
+class RList(Mapping):
+    def __init__(self, x: Any) -> None:
+        import rpy2.rinterface as ri
+        self.robj = x
+        names: Any = x.names
+        self.names: List[str] | None = (
+            None if names is ri.NULL or not len(names) else
+            ["" if n is ri.NA_Character else str(n) for n in names]
+        )
+        self.cache: Dict[int, Any] = {}
+
+    def __repr__(self) -> str:
+        kind: str = "named" if self.names is not None else "unnamed"
+        return f"RList({kind}, length={len(self)})"
+
+    def __len__(self) -> int:
+        return len(self.robj)
+
+    def __iter__(self) -> Iterator[Any]:
+        # keys of named lists, and (converted) elements of unnamed lists
+        if self.names is not None:
+            return iter(self.names)
+        return (self[i] for i in range(len(self)))
+
+    def __contains__(self, key: Any) -> bool:
+        if self.names is not None:
+            return key in self.names
+        return any(values_equal(x, key) for x in self)
+
+    def __reversed__(self) -> Iterator[Any]:
+        return iter(self.keys()[::-1] if self.names is not None else
+                    self.values()[::-1])
+
+    def __eq__(self, other: Any) -> bool:
+        # element-wise, where numpy arrays are equal if their shapes and
+        # elements are. Named lists compare to dicts, unnamed lists to lists
+        match other:
+            case RList():
+                keys, values = other.keys(), other.values()
+            case dict() if self.names is not None:
+                keys, values = list(other), list(other.values())
+            case list() | tuple() if self.names is None:
+                keys, values = list(range(len(other))), list(other)
+            case _:
+                return False
+        return self.keys() == keys and \
+            all(values_equal(a, b) for a, b in zip(self.values(), values))
+
+    def __getitem__(self, key: str | int | slice) -> Any:
+        # by name, or by (0-based) position. Slices give a list of elements
+        if isinstance(key, slice):
+            return [self[i] for i in range(len(self))[key]]
+        i: int = self.position(key)
+        if i not in self.cache:
+            if not on_rthread():
+                return run_on_rthread(self.__getitem__, key)
+            from .rbuffer import rpy2py
+            from .convert_r2py import convert_r2py, is_plain_rlist
+            x: Any = rpy2py(self.robj[i])
+            # nested lists are always lazy, see `to_py()`
+            self.cache[i] = RList(x) if is_plain_rlist(x) else convert_r2py(x)
+        return self.cache[i]
+
+    def position(self, key: str | int) -> int:
+        match key:
+            case str() if self.names is not None and key in self.names:
+                return self.names.index(key) # the first match, like `[[` in R
+            case int() if -len(self) <= key < len(self):
+                return key % len(self)
+            case int() if self.names is None:
+                raise IndexError(key)
+            case _:
+                raise KeyError(key)
+
+    def keys(self) -> List[Any]:
+        return list(self.names) if self.names is not None else list(range(len(self)))
+
+    # by position, as keys of named lists may be duplicated, and those of
+    # unnamed lists aren't what iterating them gives
+    def values(self) -> List[Any]:
+        return [self[i] for i in range(len(self))]
+
+    def items(self) -> List[Tuple[Any, Any]]:
+        return list(zip(self.keys(), self.values()))
+
+    def to_py(self) -> Dict[str, Any] | List[Any]:
+        # converts the whole list, including nested lists, into dicts (named
+        # lists) and lists (unnamed lists). Nested lists are converted
+        # iteratively, so deeply nested lists don't hit the recursion limit.
+        # Of duplicated names, the first element is kept (like `[[` in R),
+        # with a warning
+        if not on_rthread():
+            return run_on_rthread(self.to_py)
+        duplicated: bool = False
+        out: Dict[str, Any] | List[Any] = empty_container(self)
+        stack: List[Tuple[RList, Dict | List]] = [(self, out)]
+        while stack:
+            x, dest = stack.pop()
+            for i, key in enumerate(x.keys()):
+                value: Any = x[i]
+                if isinstance(value, RList):
+                    child = empty_container(value)
+                    stack.append((value, child))
+                    value = child
+                if isinstance(dest, dict):
+                    duplicated = duplicated or key in dest
+                    dest.setdefault(key, value)
+                else:
+                    dest.append(value)
+        if duplicated:
+            warnings.warn("R list has duplicated names, only the first element "
+                          "of each name is kept (see `RList.items()`)")
+        return out
+
+    def to_dict(self) -> Dict[Any, Any]:
+        out: Dict[str, Any] | List[Any] = self.to_py()
+        return out if isinstance(out, dict) else dict(enumerate(out))
+
+    def to_list(self) -> List[Any]:
+        return self.values()
+
+
+def empty_container(x: RList) -> Dict | List:
+    return {} if x.names is not None else []
+
+
+def values_equal(a: Any, b: Any) -> bool:
+    match a, b:
+        case (RList(), _):
+            return a == b
+        case (_, RList()):
+            return b == a
+        case (np.ndarray(), _) | (_, np.ndarray()):
+            return np.array_equal(a, b)
+        case (dict(), dict()):
+            return list(a) == list(b) and \
+                all(values_equal(a[k], b[k]) for k in a)
+        case (list() | tuple(), list() | tuple()):
+            return len(a) == len(b) and \
+                all(values_equal(x, y) for x, y in zip(a, b))
+        case _ if hasattr(a, "equals"): # pandas objects
+            return bool(a.equals(b))
+        case _:
+            return bool(a == b)
@@ -0,0 +1,158 @@
+# Control of R's memory in long-running processes. R objects created by
+# wrapr live as long as they are referenced from python, or bound in an R
+# environment. To keep the footprint of a process steady:
+#
+#   with wr.scope():
+#       env.__function__("f", "function(x) x + 1") # bound in the scope
+#       ...
+#   # the bindings of the scope are removed, and garbage is collected
+#
+# Collections can also be triggered automatically, every `gc_calls` calls of
+# wrapped R functions, or when R's heap exceeds `gc_heap_bytes`. `memory()`
+# reports the size of R's heap and the number of R objects protected by rpy2
+import gc
+
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .options import OPTIONS
+from .rthread import on_rthread, run_on_rthread
+
+
+# the heap size is only checked every this many calls, as measuring it
+# triggers a (minor) garbage collection
+HEAP_CHECK_CALLS: int = 100
+
+
+class Scope:
+    def __init__(self, env: Any) -> None:
+        self.env = env
+        # (Renv, name, previous attribute, attached function) of the
+        # functions attached by `Renv.__function__`
+        self.attached: List[Tuple[Any, str, Any, Any]] = []
+
+
+# the scopes entered by the current thread (or asyncio task), innermost last.
+# The context of the caller is carried over to the R thread, see `rthread`
+SCOPES: ContextVar[Tuple[Scope, ...]] = ContextVar("wrapr_scopes", default=())
+
+# calls of wrapped functions since the last collection
+CALLS: int = 0
+
+MISSING: Any = object()
+
+
+def current_env() -> Any:
+    # the environment R code is evaluated in, i.e., that of the innermost
+    # scope, or the global environment
+    import rpy2.rinterface as ri
+    scopes: Tuple[Scope, ...] = SCOPES.get()
+    return scopes[-1].env if scopes else ri.globalenv
+
+
+def new_scope_env() -> Any:
+    if not on_rthread():
+        return run_on_rthread(new_scope_env)
+    from .rutils import rcall_cached
+    return rcall_cached("function(parent) new.env(parent = parent)")(current_env())
+
+
+def release_scope(s: Scope, collect_garbage: bool) -> None:
+    if not on_rthread():
+        return run_on_rthread(release_scope, s, collect_garbage)
+    from .rutils import rcall_cached, invalidate_rcache
+    names: List[str] = list(s.env.keys())
+    rcall_cached("function(env) rm(list = ls(env, all.names = TRUE), envir = env)")(s.env)
+    for name in names:
+        invalidate_rcache(name)
+    # in reverse, such that a name attached twice is restored to what it was
+    # before the scope. Attributes replaced since (e.g., by an enclosing
+    # scope) are left as they are
+    for renv, name, previous, attached in reversed(s.attached):
+        if renv.__dict__.get(name, MISSING) is not attached:
+            continue
+        if previous is MISSING:
+            del renv.__dict__[name]
+        else:
+            renv.__dict__[name] = previous
+    s.attached.clear()
+    s.env = None
+    if collect_garbage:
+        collect()
+
+
+@contextmanager
+def scope(collect_garbage: bool = True) -> Iterator[Any]:
+    # R code run by wrapr within the block (e.g., `rcall()`,
+    # `Renv.__function__()` and lazy arguments) is evaluated in a temporary
+    # environment (a child of the enclosing scope), which is cleared on exit.
+    # Functions attached to Renvs by `__function__` are removed as well. The
+    # scope only applies to the thread (or asyncio task) entering it
+    s: Scope = Scope(new_scope_env())
+    token: Token = SCOPES.set(SCOPES.get() + (s,))
+    try:
+        yield s.env
+    finally:
+        SCOPES.reset(token)
+        release_scope(s, collect_garbage)
+
+
+def attribute(renv: Any, name: str) -> Any:
+    # the attribute `name` of `renv`, as passed to `track_function()`
+    return renv.__dict__.get(name, MISSING)
+
+
+def track_function(renv: Any, name: str, previous: Any) -> None:
+    # `previous` is the attribute before `name` was attached, see `attribute()`
+    scopes: Tuple[Scope, ...] = SCOPES.get()
+    if scopes:
+        scopes[-1].attached.append((renv, name, previous, renv.__dict__.get(name)))
+
+
+def collect() -> None:
+    # python's collection runs first, such that R objects which are only
+    # referenced by python garbage are released before R collects
+    global CALLS
+    if not on_rthread():
+        return run_on_rthread(collect)
+    from .rutils import rcall_cached
+    CALLS = 0
+    gc.collect()
+    rcall_cached("function() invisible(gc(full = TRUE))")()
+
+
+def after_call() -> None:
+    # automatic collections, see the `gc_calls` and `gc_heap_bytes` options
+    global CALLS
+    CALLS += 1
+    every: int | None = OPTIONS["gc_calls"]
+    limit: int | None = OPTIONS["gc_heap_bytes"]
+    if every and CALLS >= every:
+        CALLS = 0
+        collect()
+    elif limit and CALLS % HEAP_CHECK_CALLS == 0:
+        from .profiling import rheap
+        if rheap() * 2**20 >= limit:
+            CALLS = 0
+            collect()
+
+
+def memory() -> Dict[str, Any]:
+    # sizes of R's heap after a full garbage collection: the number of cons
+    # cells (Ncells) and vector cells (Vcells) in use, and their size in Mb,
+    # along with the number of R objects protected by rpy2 (i.e., referenced
+    # from python)
+    if not on_rthread():
+        return run_on_rthread(memory)
+    from rpy2.rinterface_lib._rinterface_capi import protected_rids
+    from .rutils import rcall_cached
+    m: Any = rcall_cached("function() { m <- gc(); c(m[, 1], m[, 2]) }")()
+    return {
+        "ncells": int(m[0]),
+        "vcells": int(m[1]),
+        "ncells_mb": float(m[2]),
+        "vcells_mb": float(m[3]),
+        "protected": len(protected_rids()),
+        "scopes": len(SCOPES.get()),
+    }
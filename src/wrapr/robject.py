@@ -1,31 +1,79 @@
-from logging import captureWarnings
-from typing import Any
+from typing import Any, Callable
+import numpy as np
 import rpy2.robjects as ro
-from .rutils import rcall
+import rpy2.rinterface as ri
+from numpy.typing import NDArray
+from .rutils import rcall_cached
 from .convert_r2py import convert_r2py
+from .rthread import on_rthread, run_on_rthread
 
 
 class Robject():
+    # Handle on a live R object. Handles are passed to wrapped R functions
+    # as-is, such that results can be kept in R between calls, and are only
+    # converted to python when asked for (e.g., `to_py()`, `to_numpy()` or
+    # indexing a single element)
     def __init__(self, Robj: Any):
         self.Robj = Robj
 
     def __str__(self) -> str:
-        return captureRprint(self.Robj) 
+        if not on_rthread():
+            return run_on_rthread(self.__str__)
+        return captureRprint(self.Robj)
 
     def __repr__(self):
+        if not on_rthread():
+            return run_on_rthread(self.__repr__)
         return self.Robj.__repr__()
 
     def __getattr__(self, name: str) -> Any:
+        if name.startswith("__") and name.endswith("__"):
+            raise AttributeError(name)
+        from .function_wrapper import rfunc
         fun: Callable = rfunc(name)
         return fun(self.Robj)
 
-    def __getitem__(self, *args):
-        return self.Robj.__getitem__(*args)
+    def __getitem__(self, key: Any) -> Any:
+        # list elements are looked up by name, single (atomic) elements are
+        # converted, and anything else is returned as a new handle
+        if not on_rthread():
+            return run_on_rthread(self.__getitem__, key)
+        item: Any = self.Robj.rx2(key) if isinstance(key, str) else self.Robj[key]
+        match item:
+            case ri.SexpVector() if is_scalar(item):
+                return convert_r2py(item)
+            case ri.Sexp():
+                return Robject(item)
+            case _:
+                return item
 
     def __iter__(self):
+        if not on_rthread():
+            return iter(run_on_rthread(list, self.Robj))
         return self.Robj.__iter__()
 
+    def __len__(self) -> int:
+        if not on_rthread():
+            return run_on_rthread(self.__len__)
+        return len(self.Robj)
+
+    def __array__(self, dtype: Any = None, copy: bool | None = None) -> NDArray:
+        return np.asarray(self.to_numpy(), dtype=dtype)
+
+    def to_py(self) -> Any:
+        if not on_rthread():
+            return run_on_rthread(self.to_py)
+        return convert_r2py(self.Robj)
+
+    def to_numpy(self) -> NDArray:
+        return np.asarray(self.to_py())
+
+
+def is_scalar(x: ri.SexpVector) -> bool:
+    return x.typeof not in (ri.RTYPES.VECSXP, ri.RTYPES.EXPRSXP) and \
+        len(x) == 1 and x.rclass[0] not in ("data.frame", "factor")
+
     
 def captureRprint(x) -> str:
     expr = r'function(x) paste(utils::capture.output(print(x)), collapse = "\n")'
-    return convert_r2py(rcall(expr)(x)[0])
+    return convert_r2py(rcall_cached(expr)(x)[0])
@@ -0,0 +1,64 @@
+# The thread owning the embedded R session. R is not thread-safe, so calls
+# into R are serialized: until an R thread is started (see `aio`), the
+# calling thread takes a global lock for the duration of the call, and once
+# it is started, calls made from any other thread are run on it, while the
+# calling thread waits for the result. The call is run in a copy of the
+# caller's context, such that context variables (e.g., the scopes of
+# `rmemory`) are those of the caller
+import threading
+import contextvars
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+
+R_EXECUTOR: ThreadPoolExecutor | None = None
+R_THREAD_ID: int | None = None
+R_THREAD_LOCK = threading.Lock()
+
+# held by the thread currently running R code
+R_LOCK = threading.RLock()
+R_LOCK_OWNER: int | None = None
+
+
+def start_rthread() -> ThreadPoolExecutor:
+    global R_EXECUTOR, R_THREAD_ID
+    with R_THREAD_LOCK:
+        if R_EXECUTOR is None:
+            executor = ThreadPoolExecutor(max_workers=1,
+                                          thread_name_prefix="wrapr-R")
+            thread_id: int = executor.submit(init_rthread).result()
+            R_EXECUTOR = executor
+            R_THREAD_ID = thread_id
+    return R_EXECUTOR
+
+
+def init_rthread() -> int:
+    # R is initialised on the R thread, unless it already has been
+    with R_LOCK:
+        import rpy2.robjects
+    return threading.get_ident()
+
+
+def on_rthread() -> bool:
+    # whether the current thread may call into R
+    return R_LOCK_OWNER == threading.get_ident()
+
+
+def run_locked(f: Callable, *args, **kwargs) -> Any:
+    global R_LOCK_OWNER
+    with R_LOCK:
+        R_LOCK_OWNER = threading.get_ident()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            R_LOCK_OWNER = None
+
+
+def run_on_rthread(f: Callable, *args, **kwargs) -> Any:
+    if on_rthread():
+        return f(*args, **kwargs)
+    if R_EXECUTOR is None or threading.get_ident() == R_THREAD_ID:
+        return run_locked(f, *args, **kwargs)
+    context: contextvars.Context = contextvars.copy_context()
+    return R_EXECUTOR.submit(context.run, run_locked, f, *args, **kwargs).result()
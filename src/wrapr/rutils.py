@@ -1,6 +1,47 @@
 import rpy2.robjects as ro
+import rpy2.rinterface as ri
 from typing import Any
+from .utils import LRUCache, RCACHES
+from .rthread import on_rthread, run_on_rthread
+
+
+# resolved R objects (e.g., functions), keyed by the expression they were
+# created from
+RCALL_CACHE = LRUCache(maxsize=256)
+RCACHES.append(RCALL_CACHE)
 
 
 def rcall(expr: str) -> Any:
+    # evaluated in the global environment, or in that of the current
+    # `rmemory.scope()`
+    if not on_rthread():
+        return run_on_rthread(rcall, expr)
+    from .rmemory import SCOPES, current_env
+    if SCOPES.get():
+        return ro.baseenv["eval"](ri.parse(expr), envir=current_env())
     return ro.r(expr, print_r_warnings=False, invisible=True)
+
+
+def rcall_cached(expr: str) -> Any:
+    # Only for expressions which evaluate to the same object every time,
+    # like function lookups (`Matrix::sparseMatrix`) and definitions
+    # (`function(x) ...`). Parsing and evaluating the expression is skipped
+    # on subsequent calls. Always evaluated in the global environment, also
+    # within a `rmemory.scope()`
+    out = RCALL_CACHE.get(expr)
+    if out is None:
+        if not on_rthread():
+            return run_on_rthread(rcall_cached, expr)
+        out = ro.r(expr, print_r_warnings=False, invisible=True)
+        RCALL_CACHE.put(expr, out)
+    return out
+
+
+def invalidate_rcache(name: str | None = None) -> None:
+    # must be called when a symbol is (re)defined in R, as cached lookups
+    # would otherwise refer to the old definition
+    for cache in RCACHES:
+        if name is None:
+            cache.clear()
+        else:
+            cache.pop(name)
@@ -1,12 +1,33 @@
-import termcolor as tc
-import rpy2.rinterface_lib.callbacks
+import sys
+
+from collections import OrderedDict
+from types import ModuleType
+from typing import Any, Hashable, List
 
 
 def pinfo(message: str, verbose = True) -> None:
     if verbose:
+        import termcolor as tc
         print(tc.colored('Info', 'green') + " | " + message)
 
 
+def loaded_module(name: str) -> ModuleType | None:
+    # the module, if it has already been imported. Objects from modules
+    # which haven't been imported can't exist, so this can be used for type
+    # checks without importing (heavy) modules like pandas and scipy
+    return sys.modules.get(name)
+
+
+def is_pandas(x: Any, *classes: str) -> bool:
+    pd: ModuleType | None = loaded_module("pandas")
+    return pd is not None and isinstance(x, tuple(getattr(pd, c) for c in classes))
+
+
+def is_sparse(x: Any) -> bool:
+    sparse: ModuleType | None = loaded_module("scipy.sparse")
+    return sparse is not None and sparse.issparse(x)
+
+
 class ROutputCapture:
     def __init__(self):
         self.stdout = []
@@ -16,6 +37,7 @@ class ROutputCapture:
 
     def capture_r_output(self):
         """Redirects R console output to Python lists."""
+        import rpy2.rinterface_lib.callbacks
         # Define custom functions to capture output
         def add_to_stdout(line): self.stdout.append(line)
         def add_to_stderr(line): self.stderr.append(line)
@@ -30,7 +52,43 @@ class ROutputCapture:
 
     def reset_r_output(self):
         """Resets the R output callbacks to their original state."""
+        import rpy2.rinterface_lib.callbacks
         rpy2.rinterface_lib.callbacks.consolewrite_print = self.stdout_orig
         rpy2.rinterface_lib.callbacks.consolewrite_warnerror = self.stderr_orig
 
 
+class LRUCache:
+    """Bounded mapping, evicting the least recently used items."""
+    def __init__(self, maxsize: int = 128):
+        self.maxsize = maxsize
+        self.items: OrderedDict = OrderedDict()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.items
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self.items:
+            return default
+        self.items.move_to_end(key)
+        return self.items[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self.items.pop(key, default)
+
+    def clear(self) -> None:
+        self.items.clear()
+
+
+# caches of resolved R objects (e.g., functions) and their python wrappers,
+# which must be invalidated when a symbol is (re)defined in R, see
+# `rutils.invalidate_rcache()`
+RCACHES: List[LRUCache] = []
@@ -0,0 +1,67 @@
+import asyncio
+import threading
+import numpy as np
+
+import wrapr as wr
+
+
+def test_async_calls():
+    base = wr.aio.library("base")
+
+    async def main():
+        # the event loop keeps running while R is busy, i.e., it gets to run
+        # more than once before the call is done
+        call = asyncio.ensure_future(base.Sys_sleep(0.2))
+        ticks = 0
+        while not call.done():
+            ticks += 1
+            await asyncio.sleep(0)
+        await call
+        results = await asyncio.gather(*(base.sum(np.arange(i)) for i in range(5)))
+        return ticks, results
+
+    ticks, results = asyncio.run(main())
+    assert ticks > 1
+    assert results == [0, 0, 1, 3, 6]
+
+    async def acall():
+        return await wr.library("base").acall.rev(np.arange(3.0))
+    assert np.all(asyncio.run(acall()) == np.array([2.0, 1.0, 0.0]))
+
+
+def test_calls_from_threads():
+    base = wr.library("base")
+    results = [None] * 4
+
+    def run(i):
+        results[i] = base.sum(np.arange(i + 1))
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert results == [0, 1, 3, 6]
+
+
+def test_rthread_serializes_calls():
+    # calls from different threads never run at the same time, also before
+    # the R thread is started
+    from wrapr.rthread import run_on_rthread
+    active = []
+    overlaps = []
+
+    def call():
+        active.append(1)
+        if len(active) > 1:
+            overlaps.append(1)
+        threading.Event().wait(0.01)
+        active.pop()
+
+    threads = [threading.Thread(target=lambda: [run_on_rthread(call) for _ in range(5)])
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert not overlaps
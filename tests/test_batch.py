@@ -0,0 +1,71 @@
+import wrapr as wr
+import numpy as np
+import pandas as pd
+import pytest
+
+
+base = wr.library("base")
+stats = wr.library("stats")
+
+
+def test_vcall_scalars():
+    p = np.array([0.5, 0.9, 0.95])
+    out = wr.vcall(stats.qnorm, p=p, sd=np.array([1.0, 2.0, 3.0]))
+    assert isinstance(out, np.ndarray)
+    assert np.allclose(out, [stats.qnorm(x, sd=s) for x, s in zip(p, [1.0, 2.0, 3.0])])
+    # constant arguments, and translated names
+    m = np.array([[1.0, np.nan], [2.0, 4.0]])
+    out = wr.vcall(base.rowSums, x=[m, m * 2], _const={"na_rm": True})
+    assert np.allclose(out, [[1.0, 6.0], [2.0, 12.0]])
+
+
+def test_batch():
+    out = stats.qnorm.batch([{"p": 0.5}, {"p": 0.9}], mean=1)
+    assert np.allclose(out, [1.0, 1 + stats.qnorm(0.9)])
+    # vectors of the same length are stacked into rows
+    out = base.rep.batch([{"x": 1, "times": 3}, {"x": 2, "times": 3}])
+    assert out.shape == (2, 3)
+    assert out[1].tolist() == [2, 2, 2]
+    with pytest.raises(ValueError):
+        base.rep.batch([{"x": 1}, {"times": 3}])
+
+
+def test_batch_frames():
+    f = base.function("function(i) data.frame(i = i, sq = i^2)")
+    out = f.batch([{"i": i} for i in range(1, 4)])
+    assert isinstance(out, pd.DataFrame)
+    assert out["sq"].tolist() == [1, 4, 9]
+
+
+def test_batch_lists():
+    # results which don't line up are returned as a list
+    out = base.seq_len.batch([{"length_out": 1}, {"length_out": 2}])
+    assert len(out) == 2
+    assert list(out[1]) == [1, 2]
+
+
+def test_vcall_columns():
+    # matrices and data frames aren't iterated by row by `mapply()`
+    with pytest.raises(TypeError):
+        wr.vcall(base.sum, x=np.ones((2, 2)))
+    with pytest.raises(TypeError):
+        wr.vcall(base.sum, x=pd.DataFrame({"a": [1, 2]}))
+    with pytest.raises(ValueError):
+        wr.vcall(base.sum, x=[1, 2], y=[1, 2, 3])
+
+
+def test_batch_gc_calls(monkeypatch):
+    import wrapr.rmemory
+    calls = []
+    monkeypatch.setattr(wrapr.rmemory, "collect", lambda: calls.append(1))
+    monkeypatch.setattr(wrapr.rmemory, "CALLS", 0)
+    with wr.option_context(gc_calls=2):
+        stats.qnorm.batch([{"p": 0.5}])
+        stats.qnorm.batch([{"p": 0.5}])
+    assert calls == [1]
+
+
+def test_batch_empty():
+    assert base.sum.batch([]) == []
+    rbase = wr.library("base", robject=True)
+    assert isinstance(rbase.sum.batch([]), wr.Robject)
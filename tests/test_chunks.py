@@ -0,0 +1,39 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import wrapr as wr
+from wrapr.chunks import combine_chunks, iter_chunks
+
+
+def test_iter_chunks():
+    df = pd.DataFrame({"g": [1, 1, 2, 3, 3, 3, 4], "x": np.arange(7)})
+    assert [len(c) for c in iter_chunks(df, chunksize=3)] == [3, 3, 1]
+    assert [len(c) for c in iter_chunks(df, by="g")] == [2, 1, 3, 1]
+    # groups are packed, but never split
+    assert [len(c) for c in iter_chunks(df, chunksize=3, by="g")] == [3, 3, 1]
+    assert [len(c) for c in iter_chunks(np.arange(5), chunksize=2)] == [2, 2, 1]
+
+
+def test_combine_chunks():
+    assert list(combine_chunks([np.arange(2), np.arange(1)])) == [0, 1, 0]
+    assert combine_chunks([]) is None
+    with pytest.raises(TypeError):
+        combine_chunks([np.arange(2), pd.DataFrame({"a": [1]})])
+    with pytest.raises(TypeError):
+        combine_chunks([1, 2])
+
+
+def test_map_chunks():
+    dplyr = wr.library("dplyr")
+    df = pd.DataFrame({"g": np.repeat(["a", "b", "c"], 100), "x": np.arange(300.0)})
+    out = wr.map_chunks(dplyr.mutate, df, chunksize=64,
+                        y=wr.lazily("x * 2"), combine=True)
+    assert len(out) == 300 and np.all(out["y"] == df["x"] * 2)
+
+    sums = list(wr.map_chunks("sum", df["x"].to_numpy(), chunksize=100))
+    assert sums == [4950, 14950, 24950]
+
+    out = wr.map_chunks(dplyr.summarise, df, by="g", combine=True,
+                        g=wr.lazily("g[1]"), n=wr.lazily("dplyr::n()"))
+    assert list(out["g"]) == ["a", "b", "c"] and list(out["n"]) == [100] * 3
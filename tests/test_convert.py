@@ -0,0 +1,177 @@
+import wrapr as wr
+import numpy as np
+import pandas as pd
+import scipy
+import pytest
+
+
+base = wr.library("base")
+
+
+def test_numpy_matrix_is_column_major():
+    x = np.arange(6).reshape(2, 3)
+    assert base.nrow(x) == 2
+    assert base.ncol(x) == 3
+    # R flattens in column-major order
+    assert np.all(base.c(x) == x.ravel(order="F"))
+    assert np.all(base.c(np.asfortranarray(x)) == x.ravel(order="F"))
+    # non-contiguous views
+    assert np.all(base.c(x[:, ::2]) == x[:, ::2].ravel(order="F"))
+
+
+def test_numpy_array_dtypes():
+    assert base.typeof(np.array([True, False])) == "logical"
+    assert base.typeof(np.array([1, 2], dtype="int8")) == "integer"
+    assert base.typeof(np.array([1.5, 2], dtype="float32")) == "double"
+    # too large for R integers
+    assert base.typeof(np.array([2**40, 1])) == "double"
+    x = np.arange(24).reshape(2, 3, 4)
+    assert np.all(base.dim(x) == np.array([2, 3, 4]))
+    assert np.all(base.c(x) == x.ravel(order="F"))
+
+
+def test_zero_copy_views():
+    with wr.option_context(zero_copy=True):
+        m = base.matrix(np.arange(6.0), nrow=2,
+                        dimnames=[np.array(["a", "b"]), np.array(["x", "y", "z"])])
+    assert m.flags.f_contiguous and not m.flags.writeable
+    assert np.all(m == np.arange(6.0).reshape(2, 3, order="F"))
+    df = m.to_frame()
+    assert list(df.index) == ["a", "b"]
+    assert list(df.columns) == ["x", "y", "z"]
+
+
+def test_pandas_roundtrip():
+    df = pd.DataFrame({
+        "a": pd.Categorical(["x", "y", None, "x"]),
+        "b": [1.5, 2, 3, 4],
+        "c": ["u", "v", "w", "u"],
+        "d": [True, False, True, True]
+        })
+    assert base.is_factor(df["a"])
+    assert base.nrow(df) == 4
+    df2 = base.identity(df)
+    assert list(df2.columns) == list(df.columns)
+    assert isinstance(df2["a"].dtype, pd.CategoricalDtype)
+    assert list(df2["a"].cat.categories) == ["x", "y"]
+    assert df2["a"].isna().sum() == 1
+    assert np.all(df2["b"] == df["b"])
+    assert np.all(df2["c"] == df["c"])
+    assert np.all(df2["d"] == df["d"])
+
+
+def test_sparse_matrix_from_r():
+    Matrix = wr.library("Matrix")
+    x = Matrix.sparseMatrix(i=np.array([1, 3, 2]), j=np.array([1, 1, 3]),
+                            x=np.array([1.5, 2.0, 3.0]), dims=np.array([3, 4]))
+    assert isinstance(x, scipy.sparse.csc_array)
+    assert x.shape == (3, 4) and x.nnz == 3
+    assert np.all(x.toarray() == np.array([[1.5, 0, 0, 0],
+                                           [0, 0, 3.0, 0],
+                                           [2.0, 0, 0, 0]]))
+    d = Matrix.Diagonal(3)
+    assert np.all(d.toarray() == np.eye(3))
+    # general classes which aren't converted directly
+    base.function('function() as(c(2L, 1L, 3L), "indMatrix")')()
+
+
+def test_sparse_matrix_to_r():
+    x = scipy.sparse.random(20, 10, density=0.2, format="csr", random_state=1)
+    for y in (x, x.tocsc(), x.tocoo(), x.todia(), scipy.sparse.csc_array(x)):
+        assert np.allclose(base.identity(y).toarray(), x.toarray())
+    b = scipy.sparse.csc_array(x > 0.5)
+    assert base.identity(b).dtype == bool
+
+
+def test_arrow_transfer():
+    pytest.importorskip("pyarrow")
+    from wrapr.arrow_transfer import arrow_available
+    if not arrow_available():
+        pytest.skip("nanoarrow is not installed")
+    df = pd.DataFrame({
+        "a": pd.Categorical(["x", "y", None, "x"]),
+        "b": pd.array([1, None, 3, 4], dtype="Int64"),
+        "c": ["u", "v", None, "u"],
+    })
+    with wr.option_context(arrow=True):
+        assert base.is_factor(df["a"])
+        assert base.nrow(df) == 4
+        assert base.sum(base.is_na(df)) == 3
+        df2 = base.identity(df)
+    assert isinstance(df2["a"].dtype, pd.CategoricalDtype)
+    assert list(df2["a"].cat.categories) == ["x", "y"]
+    assert df2["b"].isna().sum() == 1 and df2["b"].sum() == 8
+    assert list(df2["c"].isna()) == [False, False, True, False]
+
+
+def test_arrow_fallback():
+    pytest.importorskip("pyarrow")
+    from wrapr.arrow_transfer import arrow_available
+    if not arrow_available():
+        pytest.skip("nanoarrow is not installed")
+    with wr.option_context(arrow="auto", arrow_threshold=0):
+        # integers are the same type as without Arrow
+        df = pd.DataFrame({"a": np.arange(3)})
+        assert list(base.sapply(df, FUN="typeof")) == ["integer"]
+        # mixed types can't be converted by pyarrow
+        df = pd.DataFrame({"a": np.array(["x", 1, 2.5], dtype=object)})
+        assert base.nrow(df) == 3
+
+
+def test_distinct_strings_keep_order():
+    x = np.array(["y1", "y2", "ant"])
+    assert list(base.c(x)) == ["y1", "y2", "ant"]
+    assert list(base.c(x.astype("S"))) == ["y1", "y2", "ant"]
+    assert list(base.c(np.array(["b", "a"], dtype=object))) == ["b", "a"]
+    assert list(base.unname({"a": "y", "b": "x"})) == ["y", "x"]
+    assert list(base.names({"a": "y", "b": "x"})) == ["a", "b"]
+
+
+def test_strings():
+    x = np.array(["a", None, "bb", "a", 1], dtype=object)
+    assert list(base.is_na(x)) == [False, True, False, False, False]
+    assert list(base.nchar(np.array(["a", "bb", "a"]))) == [1, 2, 1]
+    assert list(base.unique(x[[0, 2, 3]])) == ["a", "bb"]
+
+    labels = np.array(["region" + str(i % 3) for i in range(1000)])
+    with_na = np.append(labels.astype(object), None)
+    assert base.identity(labels).dtype.kind == "U"
+    with wr.option_context(string_mode="object"):
+        y = base.identity(with_na)
+        assert y.dtype == object and y[-1] is None
+        assert y[0] is y[3]
+        assert list(y[:-1]) == list(labels)
+    with wr.option_context(string_mode="category"):
+        y = base.identity(with_na)
+        assert list(y.categories) == ["region0", "region1", "region2"]
+        assert y.isna().sum() == 1
+    with wr.option_context(string_mode="string"):
+        assert isinstance(base.identity(labels).dtype, pd.StringDtype)
+
+
+def test_homogeneous_lists():
+    assert base.typeof([1, 2, None]) == "integer"
+    assert base.typeof([1, 2.5]) == "double"
+    assert base.typeof([True, None]) == "logical"
+    assert base.typeof(["a", None]) == "character"
+    assert base.typeof([2**40, 1]) == "double"
+    assert list(base.is_na([1.5, None, float("nan")])) == [False, True, True]
+    assert base.sum([1, 2, None], na_rm=True) == 3
+    assert base.typeof([1, "a"]) == "list"
+    assert base.typeof([np.arange(3), 1]) == "list"
+    assert base.is_null(base.names([1, "a"]))
+
+    assert base.typeof({"a": 1.5, "b": 2}) == "double"
+    assert list(base.names({"a": 1, "b": "x"})) == ["a", "b"]
+
+
+def test_scalar_arguments():
+    # scalars are converted directly, and keyword arguments translated
+    assert base.typeof(1) == "integer"
+    assert base.typeof(2**40) == "double"
+    assert base.typeof(True) == "logical"
+    assert base.typeof("a") == "character"
+    assert base.typeof(None) == "NULL"
+    m = np.array([[1.0, np.nan], [2.0, 3.0]])
+    assert base.rowSums(m, na_rm=True).tolist() == [1.0, 5.0]
+    assert base.nrow(np.ones((4, 2))) == 4
@@ -0,0 +1,74 @@
+import gc
+import numpy as np
+import pandas as pd
+import pytest
+
+import wrapr as wr
+from wrapr.convert_cache import CONVERSION_CACHE, cached_conversion
+
+
+class Counter:
+    def __init__(self):
+        self.n = 0
+
+    def __call__(self, x):
+        self.n += 1
+        return object()
+
+
+def test_frozen_objects_are_converted_once():
+    convert = Counter()
+    x = np.arange(100.0)
+    cached_conversion(x, convert)
+    cached_conversion(x, convert)
+    assert convert.n == 2  # not frozen
+
+    wr.freeze(x)
+    assert not x.flags.writeable
+    out = cached_conversion(x, convert)
+    assert cached_conversion(x, convert) is out
+    assert convert.n == 3
+
+    df = wr.freeze(pd.DataFrame({"a": np.arange(10)}))
+    assert cached_conversion(df, convert) is cached_conversion(df, convert)
+    # in-place changes of frozen DataFrames are caught by the fingerprint
+    out = cached_conversion(df, convert)
+    df.iloc[-1, 0] = -1
+    assert cached_conversion(df, convert) is not out
+    with pytest.raises(TypeError):
+        wr.freeze([1, 2])
+
+    n = len(CONVERSION_CACHE)
+    del x, df
+    gc.collect()
+    assert len(CONVERSION_CACHE) == n - 2
+
+
+def test_fingerprint_cache():
+    convert = Counter()
+    x = np.zeros((1000, 100))
+    df = pd.DataFrame({"a": np.zeros(10**5),
+                       "b": pd.Categorical(["x", "y"] * (10**5 // 2))})
+    with wr.option_context(conversion_cache="fingerprint"):
+        out = cached_conversion(x, convert)
+        assert cached_conversion(x, convert) is out
+        x[-1, -1] = 1  # the last element is always sampled
+        assert cached_conversion(x, convert) is not out
+        assert cached_conversion(x[:, :10], convert) is not out
+
+        out = cached_conversion(df, convert)
+        assert cached_conversion(df, convert) is out
+        df["c"] = 1.0
+        assert cached_conversion(df, convert) is not out
+        s = pd.DataFrame({"a": np.array(["x"] * 10**5, dtype=object)})
+        out = cached_conversion(s, convert)
+        s.iloc[-1, 0] = "y"
+        assert cached_conversion(s, convert) is not out
+
+        # memory bound
+        with wr.option_context(conversion_cache_bytes=x.nbytes):
+            x[0, 0] = 1
+            cached_conversion(x, convert)
+            assert CONVERSION_CACHE.nbytes <= x.nbytes
+    wr.clear_conversion_cache()
+    assert len(CONVERSION_CACHE) == 0
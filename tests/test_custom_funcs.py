@@ -9,8 +9,15 @@ def test_custom_funcs():
     foo = base.function("function(x) x * 2")
     assert foo(2) == 4
 
-    with pytest.raises(ValueError):
-        foo(b=wr.lazily("2"))
+    assert foo(x=wr.lazily("1 + 1")) == 4
 
     with pytest.raises(TypeError):
         base.foo_attached2namespace(wr.lazily("2"))
+
+
+def test_redefined_funcs():
+    base = wr.library("base")
+    base.__function__(name="foo_redefined", expr="function(x) x * 2")
+    assert wr.library("utils").foo_redefined(2) == 4
+    base.__function__(name="foo_redefined", expr="function(x) x * 3")
+    assert wr.library("utils").foo_redefined(2) == 6
@@ -10,7 +10,7 @@ dt = wr.library("datasets")
 
 def test_last():
     assert dplyr.last(x=np.array([1, 2, 3, 4])) == 4
-    assert dplyr.last(x=[1, 2, 3, 4]) == 4 # should now throw error
+    assert dplyr.last(x=[1, 2, 3, 4]) == 4
 
 
 def test_mutate():
@@ -20,3 +20,18 @@ def test_mutate():
     assert np.all(np.round(df["Sepal.Length"] * 2) == df["Sepal"])
     with pytest.raises(TypeError):
         dplyr.mutate(iris, wr.lazily("Sepal.Length * 2"))
+
+
+def test_pipe():
+    iris = dt.iris
+    p = (wr.pipe(iris, dplyr)
+         .mutate(Sepal = wr.lazily("round(Sepal.Length * 2, 0)"))
+         .filter(wr.lazily("Sepal > 12"))
+         .select(wr.lazily("Species"), wr.lazily("Sepal")))
+    assert repr(p) == "pipe |> mutate |> filter |> select"
+    df = p.collect()
+    assert list(df.columns) == ["Species", "Sepal"]
+    assert np.all(df["Sepal"] > 12)
+    assert len(df) == np.sum(np.round(iris["Sepal.Length"] * 2) > 12)
+    # functions which aren't found in the environments are looked up in R
+    assert wr.pipe(np.arange(4.0)).rev().sum().collect() == 6
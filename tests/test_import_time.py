@@ -0,0 +1,28 @@
+import os
+import sys
+import subprocess
+
+import wrapr as wr
+
+
+SCRIPT = """
+import sys, warnings
+filters = list(warnings.filters)
+import wrapr
+heavy = [m for m in ("rpy2", "pandas", "scipy", "termcolor") if m in sys.modules]
+print(heavy, filters == warnings.filters)
+"""
+
+
+def test_import_is_lazy():
+    path = os.path.dirname(os.path.dirname(wr.__file__))
+    env = dict(os.environ, PYTHONPATH=path)
+    out = subprocess.run([sys.executable, "-c", SCRIPT], env=env, check=True,
+                         capture_output=True, text=True).stdout
+    # neither R nor the heavy python dependencies are imported
+    assert out.strip() == "[] True"
+
+
+def test_lazy_exports():
+    assert "library" in dir(wr)
+    assert callable(wr.lazily)
@@ -0,0 +1,76 @@
+import wrapr as wr
+import numpy as np
+import pytest
+
+from wrapr.rutils import rcall
+
+
+base = wr.library("base")
+
+
+def test_scope():
+    with wr.scope():
+        base.__function__(name="foo_scoped", expr="function(x) x + 1")
+        base.__function__(name="bar_scoped", expr="function(x) foo_scoped(x) * 2")
+        assert base.bar_scoped(1) == 4
+        assert base.sapply(np.array([1, 2]), FUN=wr.lazily("foo_scoped")).tolist() == [2, 3]
+        assert wr.memory()["scopes"] == 1
+    assert not rcall('exists("foo_scoped")')[0]
+    assert "foo_scoped" not in vars(base)
+    assert wr.memory()["scopes"] == 0
+
+
+def test_nested_scopes():
+    with wr.scope():
+        rcall("x_outer <- 1")
+        with wr.scope():
+            rcall("x_inner <- x_outer + 1")
+            assert rcall("x_inner")[0] == 2
+        assert not rcall('exists("x_inner")')[0]
+        assert rcall("x_outer")[0] == 1
+    assert not rcall('exists("x_outer")')[0]
+
+
+def test_scope_restores_functions():
+    base.__function__(name="foo_outside", expr="function(x) x + 1")
+    outside = vars(base)["foo_outside"]
+    with wr.scope():
+        base.__function__(name="foo_outside", expr="function(x) x + 2")
+        assert base.foo_outside(1) == 3
+    assert vars(base)["foo_outside"] is outside
+    assert base.foo_outside(1) == 2
+
+
+def test_scope_is_thread_local():
+    import threading
+    out = {}
+
+    def other_thread():
+        out["scopes"] = wr.memory()["scopes"]
+        rcall("x_other_thread <- 1")
+
+    with wr.scope():
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+    assert out["scopes"] == 0
+    # bound in the global environment, not in the scope
+    assert rcall("x_other_thread")[0] == 1
+
+
+def test_memory():
+    m = wr.memory()
+    assert m["ncells"] > 0 and m["vcells"] > 0
+    assert m["vcells_mb"] > 0
+    assert m["protected"] > 0
+
+
+def test_gc_calls(monkeypatch):
+    import wrapr.rmemory
+    calls = []
+    monkeypatch.setattr(wrapr.rmemory, "collect", lambda: calls.append(1))
+    monkeypatch.setattr(wrapr.rmemory, "CALLS", 0)
+    with wr.option_context(gc_calls=10):
+        for _ in range(25):
+            base.invisible(1)
+    assert len(calls) == 2
@@ -0,0 +1,63 @@
+import os
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import wrapr as wr
+from wrapr.pool import SharedArray, SharedFrame, share, unshare, release
+
+
+def test_shared_memory_roundtrip():
+    x = np.asfortranarray(np.random.default_rng(1).standard_normal((1000, 200)))
+    df = pd.DataFrame({
+        "a": np.arange(10**6),
+        "b": pd.Categorical.from_codes(np.arange(10**6) % 3, ["x", "y", "z"]),
+        "c": ["u"] * 10**6,
+    })
+    blocks = []
+    shared = share([x, {"df": df, "small": np.arange(3)}], blocks)
+    assert isinstance(shared[0], SharedArray)
+    assert isinstance(shared[1]["df"], SharedFrame)
+    assert isinstance(shared[1]["small"], np.ndarray)
+
+    attached = []
+    y, rest = unshare(shared, attached, copy=True)
+    release(attached)
+    release(blocks, unlink=True)
+    assert y.flags.f_contiguous and np.all(y == x)
+    assert rest["df"].equals(df)
+    assert np.all(rest["small"] == np.arange(3))
+
+
+def test_shared_memory_edge_cases():
+    Point = namedtuple("Point", ["x", "y"])
+    blocks, attached = [], []
+    p = unshare(share(Point(np.zeros(10**6), 1), blocks), attached, copy=True)
+    release(attached)
+    release(blocks, unlink=True)
+    assert isinstance(p, Point) and p.y == 1 and p.x.shape == (10**6,)
+    # frames without columns keep their rows
+    df = pd.DataFrame(index=range(5))
+    assert len(unshare(share(df, blocks), attached, copy=True)) == 5
+
+
+def test_submit_releases_blocks_on_failure():
+    pool = wr.Pool(1)
+    pool.shutdown()
+    before = set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+    with pytest.raises(RuntimeError):
+        pool.submit("base", "sum", np.zeros(10**6))
+    if os.path.isdir("/dev/shm"):
+        assert set(os.listdir("/dev/shm")) == before
+
+
+def test_pool():
+    with wr.Pool(2, libraries=["base"]) as pool:
+        base = pool.library("base")
+        assert list(pool.map(base.sum, [np.arange(3), np.arange(4)])) == [3, 6]
+        x = np.random.default_rng(1).standard_normal(10**6)
+        assert np.all(base.rev(x).result() == x[::-1])
+        assert pool.submit("base", "nrow", pd.DataFrame({"a": x})).result() == 10**6
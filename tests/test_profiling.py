@@ -0,0 +1,25 @@
+import wrapr as wr
+import numpy as np
+
+
+def test_profile():
+    base = wr.library("base")
+    records = []
+    with wr.profile(memory=True, callback=records.append) as p:
+        base.sum(np.arange(1000.0))
+        base.sum(np.arange(10.0))
+        base.rep(1.0, 100)
+    stats = p.stats()
+    assert stats["sum"]["calls"] == 2
+    assert stats["sum"]["bytes_in"] == 8 * 1010
+    assert stats["rep"]["bytes_out"] == 8 * 100
+    assert all(r["rcall"] >= 0 and r["rheap"] is not None for r in records)
+    assert len(records) == 3
+
+    # nothing is recorded when profiling is disabled
+    wr.reset_stats()
+    base.sum(np.arange(10.0))
+    assert wr.stats() == {}
+    with wr.option_context(profile=True):
+        base.sum(np.arange(10.0))
+    assert wr.stats()["sum"]["calls"] == 1
@@ -0,0 +1,70 @@
+import inspect
+import wrapr as wr
+import wrapr.manifest
+import wrapr.renv
+import pytest
+
+
+def test_manifest_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("WRAPR_CACHE_DIR", str(tmp_path))
+    dt = wr.library("datasets")
+    assert "iris" in dir(dt)
+    assert list(tmp_path.glob("manifests/datasets-*.json"))
+
+    def build_manifest(pkg):
+        raise AssertionError("manifest should be read from the cache")
+
+    monkeypatch.setattr(wrapr.manifest, "build_manifest", build_manifest)
+    dt = wr.library("datasets")
+    assert dt.iris.shape == (150, 5)
+
+
+def test_signatures():
+    utils = wr.library("utils")
+    assert "x" in inspect.signature(utils.head).parameters
+    assert "set_seed" in dir(wr.library("base"))
+
+
+def test_data_cache(tmp_path, monkeypatch):
+    monkeypatch.setenv("WRAPR_CACHE_DIR", str(tmp_path))
+    dt = wr.library("datasets")
+    names = dt.state_name
+    assert list(tmp_path.glob("datasets/datasets-*/*/state.name.npy"))
+
+    def fetch_data(dataset, env_name):
+        raise AssertionError("dataset should be read from the cache")
+
+    monkeypatch.setattr(wrapr.renv, "fetch_data", fetch_data)
+    cached = wr.library("datasets").state_name
+    assert list(cached) == list(names)
+    assert cached.flags.writeable == names.flags.writeable
+    # other conversion options are cached separately
+    with wr.option_context(string_mode="category"):
+        with pytest.raises(AssertionError):
+            wr.library("datasets").state_name
+
+
+def test_data_cache_frames(tmp_path, monkeypatch):
+    pytest.importorskip("pyarrow")
+    monkeypatch.setenv("WRAPR_CACHE_DIR", str(tmp_path))
+    iris = wr.library("datasets").iris
+    assert list(tmp_path.glob("datasets/datasets-*/*/iris.feather"))
+
+    def fetch_data(dataset, env_name):
+        raise AssertionError("dataset should be read from the cache")
+
+    monkeypatch.setattr(wrapr.renv, "fetch_data", fetch_data)
+    cached = wr.library("datasets").iris
+    assert cached.equals(iris)
+
+
+def test_index_per_library(tmp_path, monkeypatch):
+    # packages are looked up again for other R installations or libraries
+    monkeypatch.setenv("WRAPR_CACHE_DIR", str(tmp_path))
+    wrapr.manifest.library_key.cache_clear()
+    wr.library("datasets")
+    monkeypatch.setenv("R_LIBS_USER", str(tmp_path / "lib"))
+    wrapr.manifest.library_key.cache_clear()
+    wr.library("datasets")
+    wrapr.manifest.library_key.cache_clear()
+    assert len(list(tmp_path.glob("index/*.json"))) == 2
@@ -0,0 +1,64 @@
+import numpy as np
+import pytest
+
+import wrapr as wr
+
+
+base = wr.library("base")
+
+
+def test_rlist():
+    x = base.list(a=np.arange(3.0), b="x", c=base.list(1, 2))
+    assert isinstance(x, wr.RList)
+    assert list(x.keys()) == ["a", "b", "c"] and len(x) == 3
+    assert not x.cache
+    assert x["b"] == "x" and x[1] == "x" and x[-2] == "x"
+    assert list(x.cache) == [1]
+    assert isinstance(x["c"], wr.RList) and list(x["c"]) == [1, 2]
+    assert "a" in x and "d" not in x
+    with pytest.raises(KeyError):
+        x["d"]
+    d = x.to_dict()
+    assert list(d) == ["a", "b", "c"] and d["c"] == [1, 2]
+    # passed back to R without conversion
+    assert base.length(x) == 3
+
+    with wr.option_context(lazy_lists=False):
+        assert isinstance(base.list(a=1, b=base.list(2)), dict)
+
+
+def test_unnamed_rlist():
+    x = base.list(1, "a", base.list(2))
+    assert [v for v in x][:2] == [1, "a"]
+    assert x.values()[:2] == [1, "a"] and x[:2] == [1, "a"]
+    assert x.items()[1] == (1, "a")
+    assert x[::-1][1] == "a"
+    assert list(reversed(x))[2] == 1
+    assert x == [1, "a", [2]]
+    with pytest.raises(IndexError):
+        x[3]
+    y = base.list(a=1, b="x")
+    assert y.values() == [1, "x"] and y.items() == [("a", 1), ("b", "x")]
+    assert y == {"a": 1, "b": "x"}
+    # numpy arrays are compared element-wise
+    z = base.list(a=np.arange(3.0), b=base.list(np.arange(2.0)))
+    assert z == {"a": np.arange(3.0), "b": [np.arange(2.0)]}
+    assert z != {"a": np.arange(2.0), "b": [np.arange(2.0)]}
+    assert z == base.list(a=np.arange(3.0), b=base.list(np.arange(2.0)))
+    # duplicated names keep the first element
+    d = base.c(base.list(a=1), base.list(a=2))
+    assert d.items() == [("a", 1), ("a", 2)]
+    with pytest.warns(UserWarning):
+        assert d.to_py() == {"a": 1}
+
+
+def test_deeply_nested_rlist():
+    x = wr.library("base").function(
+        "function(n) { x <- list(); for (i in seq_len(n)) x <- list(x = x); x }"
+    )(5000)
+    d = x.to_py()
+    depth = 0
+    while d:
+        d = d["x"]
+        depth += 1
+    assert depth == 5000
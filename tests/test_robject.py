@@ -0,0 +1,34 @@
+import wrapr as wr
+import numpy as np
+import pytest
+
+
+def test_robject_handles():
+    base = wr.library("base")
+    x = base.seq(1, 10, _robject=True)
+    assert isinstance(x, wr.Robject)
+    assert len(x) == 10
+    # handles are passed to R without conversion
+    assert base.sum(x) == 55
+    assert np.all(x.to_numpy() == np.arange(1, 11))
+    assert x[0] == 1
+
+    rbase = wr.library("base", robject=True)
+    l = rbase.list(a=np.arange(3.0), b=2)
+    assert isinstance(l, wr.Robject)
+    assert isinstance(l["a"], wr.Robject)
+    assert l["b"] == 2
+    assert np.all(np.asarray(l["a"]) == np.arange(3.0))
+    assert isinstance(rbase.rev(l["a"]), wr.Robject)
+    assert np.all(base.rev(l["a"]) == np.array([2.0, 1.0, 0.0]))
+
+
+def test_robject_fallback_functions():
+    # functions which aren't in the package are wrapped per Renv
+    from wrapr.rutils import rcall
+    rcall("robject_global_fn <- function() 1:3")
+    with pytest.warns(UserWarning):
+        x = wr.library("base", robject=True).robject_global_fn()
+    assert isinstance(x, wr.Robject)
+    with pytest.warns(UserWarning):
+        assert list(wr.library("base").robject_global_fn()) == [1, 2, 3]